@@ -1,19 +1,32 @@
+import uuid
+
 import streamlit as st
-from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 
+from model_session import get_session
+from context_window import ContextWindow
+from database import Database, MessageWriter
+
+PAGE_SIZE = 20
+
+db = Database()
+writer = MessageWriter(db)
+
 
 class ChatPage:
     """
     Renders the chat page UI and handles chat message flow.
-    Displays a styled title, manages user and AI messages, and calls the LLM for responses.
+    Displays a styled title, manages user and AI messages, and streams the LLM's responses.
     """
 
     @staticmethod
     def render():
         """
         Builds the chat interface, loads past messages, sends new user prompts
-        to the LLM, and displays AI responses.
+        to the LLM, and streams the AI response into the page token by token.
+        The LLM is only called for a new user turn.
+        Messages are saved to the database in the background, and only the
+        latest page of them is shown until older ones are asked for.
         """
 
         st.markdown(
@@ -34,8 +47,27 @@ class ChatPage:
                     """
                 )
             )
+            ChatPage.open_conversation()
+
+        stats = get_session().stats()
+        if stats["warm_up_error"]:
+            st.sidebar.warning(f"Could not load the model: {stats['warm_up_error']}")
+            # The failed session stays cached otherwise; the next render tries again
+            get_session.clear()
+        if stats["load_s"] is not None:
+            st.sidebar.caption(f"Model loaded in {stats['load_s']:.1f} s")
+        if stats["first_token_s"] is not None:
+            st.sidebar.caption(
+                f"First token: {stats['first_token_s']:.2f} s "
+                f"(median {stats['median_first_token_s']:.2f} s over {stats['replies']} replies)"
+            )
 
-        for message in st.session_state.messages:
+        history = st.session_state.messages[1:]
+        if st.session_state.shown < len(history) or st.session_state.has_older:
+            st.button("Load older messages", on_click=ChatPage.load_older)
+
+        # Only the latest page is painted, however long the conversation is
+        for message in history[-st.session_state.shown:]:
             if isinstance(message, HumanMessage):
                 with st.chat_message("User"):
                     st.markdown(message.content)
@@ -49,17 +81,85 @@ class ChatPage:
             with st.chat_message("User"):
                 st.markdown(prompt)
             st.session_state.messages.append(HumanMessage(prompt))
+            writer.add(st.session_state.conversation, "human", prompt)
+
+        # Only an unanswered user turn needs a reply; any other rerun
+        # (widgets, sidebar buttons) leaves the model and the history alone
+        messages = st.session_state.messages
+        if not isinstance(messages[-1], HumanMessage):
+            return
+
+        with st.chat_message("AI"):
+            session = get_session()
+            # Only the system message, a summary of older turns and the
+            # recent turns are sent, so each turn costs about the same
+            window = st.session_state.context.build(messages)
+            # Tokens are shown as they arrive, write_stream returns the whole reply
+            reply = st.write_stream(session.stream(window))
+        messages.append(AIMessage(reply))
+        writer.add(st.session_state.conversation, "ai", reply)
+        # Folds old turns into the summary in the background, after the reply
+        st.session_state.context.compact(messages, session.llm)
 
-        LLM = ChatOllama(
-            model="model of ollama used",
-            temperature=1
+    @staticmethod
+    def open_conversation():
+        """
+        Picks up the conversation named in the URL (?conversation=...), so it
+        survives a page reload, or starts a new one.
+        Loads its saved summary and every message after it (at least the
+        latest page) from the database, and continues the context window
+        from that summary, which is saved again after every fold.
+        """
+        conversation = st.query_params.get("conversation")
+        if conversation is None:
+            conversation = uuid.uuid4().hex
+            st.query_params["conversation"] = conversation
+        st.session_state.conversation = conversation
+
+        # Messages of this conversation may still be queued from before the reload
+        writer.flush()
+        summary, boundary_id = db.get_summary(conversation)
+        rows = db.get_messages_after(conversation, boundary_id)
+        if len(rows) < PAGE_SIZE:
+            rows, _ = db.get_messages(conversation, PAGE_SIZE)
+        oldest_id = rows[0]["id"] if rows else None
+        offset = db.count_messages(conversation, oldest_id) if rows else 0
+
+        st.session_state.messages += [ChatPage.to_message(row) for row in rows]
+        st.session_state.oldest_id = oldest_id
+        st.session_state.has_older = offset > 0
+        st.session_state.shown = PAGE_SIZE
+        st.session_state.context = ContextWindow(
+            on_fold=lambda text, covered: writer.add_summary(conversation, text, covered)
         )
+        st.session_state.context.restore(summary, sum(row["id"] <= boundary_id for row in rows), offset)
 
-        invoke = LLM.invoke(st.session_state.messages).content
+    @staticmethod
+    def load_older():
+        """
+        Shows one more page of older messages, reading it from the database
+        once every message in memory is already shown.
+        """
+        st.session_state.shown += PAGE_SIZE
+        messages = st.session_state.messages
+        if st.session_state.shown <= len(messages) - 1 or not st.session_state.has_older:
+            return
 
-        with st.chat_message("AI"):
-            st.markdown(invoke)
-        st.session_state.messages.append(AIMessage(invoke))
+        rows, has_older = db.get_messages(st.session_state.conversation, PAGE_SIZE, st.session_state.oldest_id)
+        older = [ChatPage.to_message(row) for row in rows]
+        messages[1:1] = older
+        st.session_state.context.skip(len(older))
+        st.session_state.oldest_id = rows[0]["id"] if rows else st.session_state.oldest_id
+        st.session_state.has_older = has_older
+
+    @staticmethod
+    def to_message(row):
+        """
+        Turns a database row into a HumanMessage or an AIMessage.
+        """
+        if row["role"] == "human":
+            return HumanMessage(row["content"])
+        return AIMessage(row["content"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,174 @@
+import threading
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+TOKEN_BUDGET = 3000
+MAX_TURNS = 10
+FOLD_TURNS = 4
+SUMMARY_WORDS = 150
+
+SUMMARY_PROMPT = """
+You keep a short running summary of a support conversation.
+Update the summary below with the new messages. Keep what the user shared
+about their situation and feelings and what was suggested to them.
+Answer with the updated summary only, in at most {words} words.
+
+Summary so far:
+{summary}
+
+New messages:
+{messages}
+"""
+
+
+def count_tokens(message):
+    """
+    Rough token count of a message: about four characters per token, plus
+    a few for the role. Needs no tokenizer and is close enough for a budget.
+    """
+    return len(message.content) // 4 + 4
+
+
+class ContextWindow:
+    """
+    Decides what part of the chat history is sent to the model.
+    The SystemMessage, a running summary of the older turns (as a second
+    system message) and every turn not yet in the summary are sent, cut to
+    the latest turns that fit token_budget.
+    Folding never delays a reply: compact() runs after the reply has
+    streamed, and only once more than max_turns turns (or token_budget)
+    are waiting. It then folds the oldest turns into the summary in one
+    background LLM call, leaving max_turns - fold_turns turns verbatim. So
+    there is one summary call every fold_turns turns, and the prompt stays
+    about the same size however long the conversation gets.
+    After each fold, on_fold(summary, covered) is called with the number of
+    conversation messages the summary covers, so it can be saved and given
+    back to restore() later.
+    """
+
+    def __init__(self, token_budget: int = TOKEN_BUDGET, max_turns: int = MAX_TURNS,
+                 fold_turns: int = FOLD_TURNS, on_fold=None):
+        """
+        Starts with an empty summary.
+        """
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.fold_turns = fold_turns
+        self.summary = ""
+        self.summarized = 0     # messages after the system message already in the summary
+        self.lock = threading.Lock()
+        self.folding = None     # thread of the fold in progress
+        self.inserted = 0       # messages skip() inserted, to move a fold's end that was running meanwhile
+        self.offset = 0         # conversation messages older than the history in memory
+        self.on_fold = on_fold
+
+    def build(self, messages):
+        """
+        Returns the messages to send for this turn. The first message is
+        expected to be the SystemMessage. Makes no model call.
+        """
+        system, history = messages[0], messages[1:]
+        with self.lock:
+            if self.summarized > len(history):      # the history was reset
+                self.summary, self.summarized = "", 0
+            summary, summarized = self.summary, self.summarized
+
+        budget = self.token_budget - count_tokens(system) - len(summary) // 4
+        start = self.window_start(history, summarized, budget)
+
+        window = [system]
+        if summary:
+            window.append(SystemMessage(f"Summary of the earlier conversation:\n{summary}"))
+        return window + history[start:]
+
+    def compact(self, messages, llm):
+        """
+        Call after a reply: if more than max_turns turns (or more than the
+        token budget) wait outside the summary, starts folding the oldest of
+        them into it with llm in a background thread.
+        """
+        history = messages[1:]
+        with self.lock:
+            if self.folding is not None or self.summarized > len(history):
+                return
+            summarized, inserted = self.summarized, self.inserted
+
+        waiting = history[summarized:]
+        turns = sum(isinstance(message, HumanMessage) for message in waiting)
+        budget = self.token_budget - count_tokens(messages[0]) - len(self.summary) // 4
+        if turns <= self.max_turns and sum(map(count_tokens, waiting)) <= budget:
+            return
+
+        start = self.window_start(history, summarized, budget, self.max_turns - self.fold_turns)
+        if start <= summarized:
+            return
+        self.folding = threading.Thread(
+            target=self.fold, args=(history[summarized:start], start, inserted, llm), daemon=True
+        )
+        self.folding.start()
+
+    def window_start(self, history, lower, budget, max_turns=None):
+        """
+        Returns the index in history where the verbatim part starts: the
+        latest whole turns (at most max_turns) that fit budget, never before
+        lower. The latest message is always included.
+        """
+        start, turns = len(history), 0
+        while start > lower:
+            cost = count_tokens(history[start - 1])
+            if start < len(history) and cost > budget:
+                break
+            budget -= cost
+            start -= 1
+            if isinstance(history[start], HumanMessage):
+                turns += 1
+                if turns == max_turns:
+                    break
+        # the window starts at a user message, never in the middle of a turn
+        while start < len(history) - 1 and not isinstance(history[start], HumanMessage):
+            start += 1
+        return start
+
+    def restore(self, summary: str, summarized: int, offset: int):
+        """
+        Continues from a saved summary: the first summarized messages of the
+        history are already in it, and offset older messages of the
+        conversation are not in memory.
+        """
+        with self.lock:
+            self.summary, self.summarized, self.offset = summary, summarized, offset
+
+    def skip(self, count: int):
+        """
+        Accounts for count older messages inserted right after the system
+        message (e.g. a page loaded from the database). They are older than
+        the window and are not added to the summary.
+        """
+        with self.lock:
+            self.summarized += count
+            self.inserted += count
+            self.offset -= count
+
+    def fold(self, messages, end, inserted, llm):
+        """
+        Updates the summary with messages leaving the window, which end at
+        index end of the history as it was when the fold started (with
+        `inserted` messages skipped so far). Runs in the background thread.
+        """
+        text = "\n".join(
+            f"{'User' if isinstance(message, HumanMessage) else 'AI'}: {message.content}"
+            for message in messages
+        )
+        try:
+            prompt = SUMMARY_PROMPT.format(words=SUMMARY_WORDS, summary=self.summary or "(empty)", messages=text)
+            summary = llm.invoke([HumanMessage(prompt)]).content.strip()
+        except Exception as error:
+            print(f"Could not update the conversation summary: {error}")
+            summary = None
+        with self.lock:
+            if summary is not None:
+                self.summary, self.summarized = summary, end + self.inserted - inserted
+            covered = self.offset + self.summarized
+            self.folding = None
+        if summary is not None and self.on_fold is not None:
+            self.on_fold(summary, covered)
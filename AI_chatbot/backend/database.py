@@ -1,11 +1,16 @@
+import atexit
+import queue
 import sqlite3
-from datetime import date
+import threading
+import time
+from datetime import date, datetime
 
 
 class Database:
     """
-    Handles all database operations for storing and retrieving mood data.
-    Uses a SQLite database with a single table: moods.
+    Handles all database operations for storing and retrieving mood data
+    and chat history.
+    Uses a SQLite database with three tables: moods, messages and summaries.
     """
 
     def __init__(self, db_path="mood.db"):
@@ -24,15 +29,29 @@ class Database:
 
     def create_table(self):
         """
-        Creates the 'moods' table if it does not already exist.
-        The table stores:
+        Creates the 'moods', 'messages' and 'summaries' tables if they do not already exist.
+        The moods table stores:
             id    -> auto-incrementing primary key
             date  -> YYYY-MM-DD as text
             moods -> comma-separated mood labels
+        The messages table stores:
+            id           -> auto-incrementing primary key, in message order
+            conversation -> id of the chat the message belongs to
+            role         -> "human" or "ai"
+            content      -> message text
+            created      -> YYYY-MM-DDTHH:MM:SS as text
+        The summaries table stores, per conversation, the rolling summary of
+        its older messages:
+            conversation -> id of the chat, primary key
+            summary      -> summary text
+            boundary_id  -> id of the last message in the summary
+            updated      -> YYYY-MM-DDTHH:MM:SS as text
+        WAL mode lets pages read while the background writer writes.
         """
         conn = self.connect()
         cur = conn.cursor()
 
+        cur.execute("PRAGMA journal_mode=WAL")
         cur.execute("""
             CREATE TABLE IF NOT EXISTS moods (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -40,6 +59,27 @@ class Database:
                 moods TEXT NOT NULL
             )
         """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created TEXT NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS messages_by_conversation
+            ON messages (conversation, id)
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                conversation TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                boundary_id INTEGER NOT NULL,
+                updated TEXT NOT NULL
+            )
+        """)
 
         conn.commit()
         conn.close()
@@ -87,3 +127,238 @@ class Database:
             })
 
         return data
+
+    def add_messages(self, rows: list, conn=None):
+        """
+        Inserts chat messages in one transaction.
+        Each row is (conversation, role, content, created).
+        Uses conn if given (the writer thread keeps its own connection).
+        """
+        own = conn is None
+        if own:
+            conn = self.connect()
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO messages (conversation, role, content, created) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+        if own:
+            conn.close()
+
+    def get_messages(self, conversation: str, limit: int, before_id: int = None):
+        """
+        Retrieves one page of a conversation: the latest `limit` messages,
+        or the latest ones older than before_id.
+        Returns (messages, has_older), the messages oldest first as
+            { "id": 12, "role": "human" or "ai", "content": "..." }
+        and has_older telling whether even older messages exist.
+        """
+        conn = self.connect()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            SELECT id, role, content
+            FROM messages
+            WHERE conversation = ? AND id < ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (conversation, before_id if before_id is not None else 2 ** 63 - 1, limit + 1)
+        )
+
+        rows = cur.fetchall()
+        conn.close()
+
+        has_older = len(rows) > limit
+        data = []
+        for row in reversed(rows[:limit]):
+            data.append({
+                "id": row[0],
+                "role": row[1],
+                "content": row[2]
+            })
+
+        return data, has_older
+
+    def get_messages_after(self, conversation: str, after_id: int):
+        """
+        Retrieves every message of a conversation newer than after_id,
+        oldest first, in the same form as get_messages.
+        """
+        conn = self.connect()
+        cur = conn.cursor()
+
+        cur.execute(
+            """
+            SELECT id, role, content
+            FROM messages
+            WHERE conversation = ? AND id > ?
+            ORDER BY id ASC
+            """,
+            (conversation, after_id)
+        )
+
+        rows = cur.fetchall()
+        conn.close()
+
+        data = []
+        for row in rows:
+            data.append({
+                "id": row[0],
+                "role": row[1],
+                "content": row[2]
+            })
+
+        return data
+
+    def count_messages(self, conversation: str, before_id: int):
+        """
+        Returns how many messages of a conversation are older than before_id.
+        """
+        conn = self.connect()
+        cur = conn.cursor()
+
+        cur.execute(
+            "SELECT COUNT(*) FROM messages WHERE conversation = ? AND id < ?",
+            (conversation, before_id)
+        )
+
+        count = cur.fetchone()[0]
+        conn.close()
+        return count
+
+    def save_summaries(self, rows: list, conn=None):
+        """
+        Stores conversation summaries in one transaction, replacing older ones.
+        Each row is (conversation, summary, covered, updated), covered being
+        how many of the conversation's first messages the summary holds; it
+        is saved as the id of the last of them, so the messages must already
+        be written.
+        Uses conn if given (the writer thread keeps its own connection).
+        """
+        own = conn is None
+        if own:
+            conn = self.connect()
+
+        with conn:
+            for conversation, summary, covered, updated in rows:
+                row = conn.execute(
+                    """
+                    SELECT id
+                    FROM messages
+                    WHERE conversation = ?
+                    ORDER BY id ASC
+                    LIMIT 1 OFFSET ?
+                    """,
+                    (conversation, covered - 1)
+                ).fetchone()
+                if row is None:
+                    continue
+                conn.execute(
+                    """
+                    INSERT INTO summaries (conversation, summary, boundary_id, updated)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (conversation) DO UPDATE SET
+                        summary = excluded.summary,
+                        boundary_id = excluded.boundary_id,
+                        updated = excluded.updated
+                    """,
+                    (conversation, summary, row[0], updated)
+                )
+
+        if own:
+            conn.close()
+
+    def get_summary(self, conversation: str):
+        """
+        Returns (summary, boundary_id) of a conversation: its saved summary
+        and the id of the last message in it, or ("", 0) without one.
+        """
+        conn = self.connect()
+        cur = conn.cursor()
+
+        cur.execute(
+            "SELECT summary, boundary_id FROM summaries WHERE conversation = ?",
+            (conversation,)
+        )
+
+        row = cur.fetchone()
+        conn.close()
+        return row if row is not None else ("", 0)
+
+
+class MessageWriter:
+    """
+    Saves chat messages from a background thread so that rendering never
+    waits on the disk.
+    add() only queues a message. The thread writes everything queued within
+    flush_interval seconds (at most batch_size messages) in one transaction.
+    add_summary() queues a conversation summary the same way; summaries are
+    written after the messages of their batch, so the messages they cover
+    are always saved first.
+    """
+
+    def __init__(self, db: Database, flush_interval: float = 0.5, batch_size: int = 100):
+        """
+        Starts the writer thread. Messages still queued when the process
+        exits are written before it ends.
+        """
+        self.db = db
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="message-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def add(self, conversation: str, role: str, content: str):
+        """
+        Queues one message for writing and returns at once.
+        """
+        created = datetime.now().isoformat(timespec="seconds")
+        self.queue.put(("message", (conversation, role, content, created)))
+
+    def add_summary(self, conversation: str, summary: str, covered: int):
+        """
+        Queues the summary of a conversation's first `covered` messages and
+        returns at once. Safe to call from any thread.
+        """
+        updated = datetime.now().isoformat(timespec="seconds")
+        self.queue.put(("summary", (conversation, summary, covered, updated)))
+
+    def flush(self):
+        """
+        Blocks until every queued message is written.
+        """
+        self.queue.join()
+
+    def run(self):
+        """
+        Writer thread: waits for a message, gathers what else arrives within
+        flush_interval, then writes the batch.
+        """
+        conn = self.db.connect()
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            messages = [row for kind, row in batch if kind == "message"]
+            summaries = [row for kind, row in batch if kind == "summary"]
+            try:
+                self.db.add_messages(messages, conn)
+                self.db.save_summaries(summaries, conn)
+            except sqlite3.Error as error:
+                print(f"Could not save {len(messages)} chat messages and {len(summaries)} summaries: {error}")
+            for _ in batch:
+                self.queue.task_done()
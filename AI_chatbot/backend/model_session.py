@@ -0,0 +1,93 @@
+import statistics
+import time
+from collections import deque
+
+import streamlit as st
+from langchain_ollama import ChatOllama
+from langchain_core.messages import HumanMessage
+
+MODEL = "model of ollama used"
+TEMPERATURE = 1
+KEEP_ALIVE = "30m"
+
+
+class ModelSession:
+    """
+    Holds one ChatOllama client for one model configuration.
+    The client keeps its HTTP connection pool for the life of the process,
+    and keep_alive tells Ollama to keep the model loaded between turns.
+    Also records how long the model took to load and how long each reply
+    took to its first token.
+    """
+
+    def __init__(self, model: str, temperature: float, keep_alive: str = KEEP_ALIVE):
+        """
+        Builds the client. Nothing is sent to Ollama until warm_up or stream.
+        """
+        self.model = model
+        self.temperature = temperature
+        self.llm = ChatOllama(
+            model=model,
+            temperature=temperature,
+            keep_alive=keep_alive
+        )
+        self.load_seconds = None
+        self.warm_up_error = None
+        self.first_token_seconds = deque(maxlen=100)
+
+    def warm_up(self):
+        """
+        Sends a one-word request and stops at the first token, which makes
+        Ollama load the model now instead of on the first real message.
+        The time it takes is kept as load_seconds. A failure (e.g. Ollama not
+        running yet) is kept in warm_up_error instead of stopping the app.
+        """
+        start = time.perf_counter()
+        try:
+            for _ in self.llm.stream([HumanMessage("Hi")]):
+                break
+        except Exception as error:
+            self.warm_up_error = str(error)
+            return
+        self.load_seconds = time.perf_counter() - start
+
+    def stream(self, messages):
+        """
+        Yields the reply to the messages as text chunks, recording the
+        time to the first one.
+        """
+        start = time.perf_counter()
+        first = True
+        for chunk in self.llm.stream(messages):
+            if first:
+                self.first_token_seconds.append(time.perf_counter() - start)
+                first = False
+            yield chunk.content
+
+    def stats(self):
+        """
+        Returns the load time and the last/median time to first token, in seconds
+        (None until measured), the number of replies measured and the
+        warm-up error, if the warm-up failed.
+        """
+        times = list(self.first_token_seconds)
+        return {
+            "load_s": self.load_seconds,
+            "warm_up_error": self.warm_up_error,
+            "first_token_s": times[-1] if times else None,
+            "median_first_token_s": statistics.median(times) if times else None,
+            "replies": len(times),
+        }
+
+
+@st.cache_resource(show_spinner="Loading the model...")
+def get_session(model: str = MODEL, temperature: float = TEMPERATURE):
+    """
+    Returns the process-wide ModelSession for a model and temperature.
+    It is shared by every Streamlit session and warmed up on first use.
+    A session whose warm-up failed is cached too; call get_session.clear()
+    to have the next call build and warm up a new one.
+    """
+    session = ModelSession(model, temperature)
+    session.warm_up()
+    return session
@@ -2,6 +2,7 @@ import streamlit as st
 from state_manager import StateManager
 from chat_page import ChatPage
 from mood_page import MoodPage
+from model_session import get_session
 
 
 class app:
@@ -21,6 +22,9 @@ class app:
     )
 
     StateManager.initialize()
+    # Builds the shared model client and loads the model once per process,
+    # before the first message is sent
+    get_session()
     st.sidebar.title("Navigation")
 
     if st.sidebar.button("AI Chat"):
@@ -0,0 +1,274 @@
+"""Placement-evaluating autoplayer.
+
+For the active piece (and, with lookahead, the next one) every rotation x
+column drop is applied to the board at once: the boards after each drop are
+one NumPy array, and line clears and the scoring features are computed over
+the whole batch instead of in a Python loop per placement.
+
+With lookahead, the best score of the next piece on each board after the
+first drop is memoized in a `TranspositionTable` keyed by the board's
+Zobrist hash (the same one `Board.hash` keeps) and the next kind, so a board
+reached again only costs a dict lookup.
+"""
+import argparse
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from engine import Engine, ORIENTATIONS
+
+# aggregate height, holes, bumpiness, lines cleared
+WEIGHTS = (-0.510066, -0.35663, -0.184483, 0.760666)
+LOST = -1e9     # score of a placement that ends the game
+ROW_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)     # as in engine.row_hash
+
+
+class Placements:
+    """Every distinct (rotation, col) hard drop of one kind, as index arrays"""
+
+    def __init__(self, kind, width):
+        seen, rotations, cols, cells = set(), [], [], []
+        for rotation, turn in enumerate(ORIENTATIONS[kind]):
+            min_c = min(c for c, _ in turn)
+            max_c = max(c for c, _ in turn)
+            min_r = min(r for _, r in turn)
+            shape = frozenset((c - min_c, r - min_r) for c, r in turn)
+            if shape in seen:       # O turns into itself, I/S/Z have two looks
+                continue
+            seen.add(shape)
+            for col in range(-min_c, width - max_c):
+                rotations.append(rotation)
+                cols.append(col)
+                cells.append(turn)
+        cells = np.array(cells)
+        self.rotations = np.array(rotations)
+        self.cols = np.array(cols)
+        self.cell_cols = self.cols[:, None] + cells[..., 0]     # (P, 4) board columns
+        self.cell_rows = cells[..., 1]                          # (P, 4) rows in the box
+
+    def __len__(self):
+        return len(self.cols)
+
+
+def board_array(board):
+    """(height, width) bool array of a `Board`'s row masks, for any width"""
+    size = (board.width + 7) // 8
+    data = b"".join(mask.to_bytes(size, "little") for mask in board.rows)
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(board.height, size),
+                         axis=1, bitorder="little")
+    return bits[:, :board.width].astype(bool)
+
+
+def column_heights(boards):
+    """(N, width) heights of (N, height, width) boards, 0 for empty columns"""
+    height = boards.shape[1]
+    top = boards[:, ::-1, :].argmax(axis=1)
+    return np.where(boards.any(axis=1), height - top, 0)
+
+
+def clear_full_rows(boards):
+    """(N, height, width) boards with their full rows removed, and the lines each cleared"""
+    full = boards.all(axis=2)
+    lines = full.sum(axis=1)
+    if lines.any():
+        # stable sort puts the kept rows first, in order; the cleared ones go on top and are emptied
+        order = np.argsort(full, axis=1, kind="stable")
+        boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+        boards[np.arange(boards.shape[1]) >= boards.shape[1] - lines[:, None]] = False
+    return boards, lines
+
+
+def board_hashes(boards, keys):
+    """`Board.hash` of each (N, rows, width) board, given the board's Zobrist `keys`.
+
+    Row 0 is the bottom row and the rows above `rows` must be empty.
+    engine.row_hash only reads the low 64 bits of a row mask, besides telling
+    empty rows apart, so boards of any width hash in uint64 arithmetic.
+    """
+    count, rows, _ = boards.shape
+    packed = np.packbits(boards, axis=2, bitorder="little")[:, :, :8]
+    low = np.zeros((count, rows, 8), dtype=np.uint8)
+    low[:, :, :packed.shape[2]] = packed
+    z = (np.array(keys[:rows], dtype=np.uint64) ^ low.view("<u8")[:, :, 0]) * ROW_MULTIPLIER
+    z ^= z >> np.uint64(29)
+    z[~boards.any(axis=2)] = 0
+    return np.bitwise_xor.reduce(z, axis=1)
+
+
+def drop_all(boards, heights, placements):
+    """Drops every placement on every board.
+
+    Returns the (B * P, height, width) boards with full rows cleared, the
+    lines each drop cleared and whether it lost the game.
+    """
+    count, height, width = boards.shape
+    rows = (heights[:, placements.cell_cols] - placements.cell_rows).max(axis=2)     # (B, P)
+    cell_rows = rows[:, :, None] + placements.cell_rows                             # (B, P, 4)
+    lost = (cell_rows >= height).any(axis=2).ravel()
+
+    out = np.repeat(boards[:, None], len(placements), axis=1)
+    b = np.arange(count)[:, None, None]
+    p = np.arange(len(placements))[None, :, None]
+    out[b, p, np.minimum(cell_rows, height - 1), placements.cell_cols] = True
+    out = out.reshape(-1, height, width)
+
+    out, lines = clear_full_rows(out)
+    lost |= out[:, -1].any(axis=1)
+    return out, lines, lost
+
+
+class TranspositionTable:
+    """Bounded LRU map from a search key to its result, counting hits and misses"""
+
+    def __init__(self, capacity=100_000):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class AutoPlayer:
+    """Picks the drop whose resulting board scores best, and plays it input by input.
+
+    With lookahead, the best next-piece score on each board after the first
+    drop is memoized in `table` by (board hash, next kind); a table can be
+    shared by several players, e.g. over many games.
+    """
+
+    def __init__(self, width=10, weights=WEIGHTS, lookahead=False, table=None):
+        self.weights = np.array(weights)
+        self.lookahead = lookahead
+        self.placements = {kind: Placements(kind, width) for kind in ORIENTATIONS}
+        self.table = table if table is not None else TranspositionTable()
+        self.target = None
+        self.last = None
+
+    def evaluate(self, boards, lines, lost):
+        """Weighted features of every board, LOST where the game ended"""
+        heights = column_heights(boards)
+        holes = heights.sum(axis=1) - boards.sum(axis=(1, 2))
+        bumpiness = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+        features = np.stack((heights.sum(axis=1), holes, bumpiness, lines), axis=1)
+        return np.where(lost, LOST, features @ self.weights), heights
+
+    def best(self, engine):
+        """(rotation, col) of the best drop for the active piece"""
+        next_kind = engine.shapes.peek() if self.lookahead else None
+        rotation, col, _ = self.search(engine, engine.piece.kind, next_kind)
+        return rotation, col
+
+    def search(self, engine, kind, next_kind=None):
+        """(rotation, col, score) of the best drop of `kind`, looking at `next_kind` too if given"""
+        # rows well above the stack stay empty after both drops, so they are left out of the batch
+        heights = np.array(engine.board.heights)[None]
+        rows = min(engine.board.height, int(heights.max()) + 9)
+        board = board_array(engine.board)[:rows][None]
+        first = self.placements[kind]
+        boards, lines, lost = drop_all(board, heights, first)
+        scores, heights = self.evaluate(boards, lines, lost)
+
+        if next_kind and not lost.all():
+            alive = ~lost
+            best = self.second_drop(boards[alive], heights[alive], next_kind, engine.board.keys)
+            # the lines feature is linear, so the first drop's lines are added to the cached score
+            scores = np.full(len(first), LOST)
+            scores[alive] = np.where(best == LOST, LOST, best + self.weights[3] * lines[alive])
+
+        i = int(scores.argmax())
+        return int(first.rotations[i]), int(first.cols[i]), float(scores[i])
+
+    def second_drop(self, boards, heights, kind, keys):
+        """Best score of a `kind` drop on each board (counting only its own lines).
+
+        Looked up in the table by (board hash, kind); only the boards missing
+        from it are searched.
+        """
+        hashes = board_hashes(boards, keys).tolist()
+        best = np.empty(len(boards))
+        missing = []
+        for i, h in enumerate(hashes):
+            value = self.table.get((h, kind))
+            if value is None:
+                missing.append(i)
+            else:
+                best[i] = value
+        if missing:
+            placements = self.placements[kind]
+            after, lines, lost = drop_all(boards[missing], heights[missing], placements)
+            scores, _ = self.evaluate(after, lines, lost)
+            best[missing] = scores.reshape(len(missing), -1).max(axis=1)
+            for i in missing:
+                self.table.put((hashes[i], kind), float(best[i]))
+        return best
+
+    def next_move(self, engine) -> str:
+        """The next input (an `Engine` method name) toward the best drop of the active piece"""
+        piece = engine.piece
+        state = engine.pieces, piece.col, piece.row, piece.rotation
+        if self.target is None or self.target[0] != engine.pieces:
+            self.target = engine.pieces, *self.best(engine)
+        elif state == self.last:        # the last input was blocked, drop where it is
+            return "hard_drop"
+        self.last = state
+        _, rotation, col = self.target
+        if piece.rotation != rotation:
+            return "rotate"
+        if piece.col != col:
+            return "left" if piece.col > col else "right"
+        return "hard_drop"
+
+    def play_piece(self, engine):
+        """Moves and drops the active piece"""
+        pieces = engine.pieces
+        while engine.pieces == pieces and not engine.over:
+            getattr(engine, self.next_move(engine))()
+
+    def play(self, engine, pieces) -> Engine:
+        """Plays up to `pieces` pieces headless, stopping at game over"""
+        for _ in range(pieces):
+            if engine.over:
+                break
+            self.play_piece(engine)
+        return engine
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Let the autoplayer run the engine headless")
+    parser.add_argument("--pieces", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lookahead", action="store_true")
+    args = parser.parse_args()
+
+    engine = Engine(seed=args.seed)
+    start = time.perf_counter()
+    player = AutoPlayer(engine.board.width, lookahead=args.lookahead)
+    player.play(engine, args.pieces)
+    elapsed = time.perf_counter() - start
+    print(f"{engine.pieces} pieces, {engine.lines} lines, score {engine.score}"
+          f"{', game over' if engine.over else ''}: {elapsed / max(engine.pieces, 1) * 1e3:.3f} ms per piece")
+    if args.lookahead:
+        print("transposition table:", player.table.stats())
@@ -0,0 +1,159 @@
+"""Gym-style environment stepping many Tetris boards at once.
+
+All N games live in arrays: the landed cells in one (N, height, width) bool
+array, the active pieces in per-board kind/rotation/col/row vectors and the
+7-bags in an (N, 7) array. Moves, wall kicks, gravity, locking and line
+clears are NumPy operations over the whole batch, so a step costs about the
+same Python work for 1 board as for 1000. The rules follow `Engine`.
+"""
+import numpy as np
+
+from engine import SHAPES, SHAPE_ORDER, ORIENTATIONS, KICKS, LINE_SCORES
+from autoplayer import clear_full_rows
+
+NOOP, LEFT, RIGHT, ROTATE, DOWN, HARD_DROP = range(6)
+ACTIONS = ("noop", "left", "right", "rotate", "down", "hard_drop")
+
+# (kind, rotation, cell) -> (col, row) in the box, kinds numbered as in SHAPE_ORDER
+CELLS = np.array([ORIENTATIONS[kind] for kind in SHAPE_ORDER])
+# (kind, rotation, kick) -> (dcol, drow), short kick lists padded with their last kick
+KICK_TABLE = np.array([[turn + turn[-1:] * (5 - len(turn)) for turn in KICKS[kind]]
+                       for kind in SHAPE_ORDER])
+SPAWN = np.array([SHAPES[kind][1] for kind in SHAPE_ORDER])
+SCORES = np.array(LINE_SCORES)
+
+
+class BatchEnv:
+    """N independent games stepped together.
+
+    `step(actions)` takes one action per board (see ACTIONS) and returns
+    (observations, rewards, dones, info). A board whose game ended starts a
+    new one within the same step, so every board is always playable.
+    Observations are (N, height, width) uint8 arrays: 1 for landed cells, 2
+    for the active piece.
+    """
+
+    def __init__(self, num=64, width=10, height=20, seed=None):
+        self.num = num
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.index = np.arange(num)
+        self.boards = np.zeros((num, height, width), dtype=bool)
+        self.kind = np.zeros(num, dtype=np.int64)
+        self.rotation = np.zeros(num, dtype=np.int64)
+        self.col = np.zeros(num, dtype=np.int64)
+        self.row = np.zeros(num, dtype=np.int64)
+        self.bags = np.zeros((num, len(SHAPE_ORDER)), dtype=np.int64)
+        self.bag_pos = np.full(num, len(SHAPE_ORDER))
+        self.score = np.zeros(num, dtype=np.int64)
+        self.lines = np.zeros(num, dtype=np.int64)
+        self.pieces = np.zeros(num, dtype=np.int64)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.restart(np.ones(self.num, dtype=bool))
+        return self.observe()
+
+    def restart(self, mask):
+        """Starts new games on the boards in `mask`"""
+        self.boards[mask] = False
+        self.bag_pos[mask] = len(SHAPE_ORDER)
+        self.score[mask] = 0
+        self.lines[mask] = 0
+        self.pieces[mask] = 0
+        self.spawn(mask)
+
+    def spawn(self, mask):
+        """Deals the next bag piece above each board in `mask`, returns the boards it doesn't fit"""
+        refill = mask & (self.bag_pos == len(SHAPE_ORDER))
+        if refill.any():
+            fresh = np.tile(np.arange(len(SHAPE_ORDER)), (int(refill.sum()), 1))
+            self.bags[refill] = self.rng.permuted(fresh, axis=1)
+            self.bag_pos[refill] = 0
+        kind = self.bags[self.index, np.minimum(self.bag_pos, len(SHAPE_ORDER) - 1)]
+        self.kind = np.where(mask, kind, self.kind)
+        self.bag_pos = np.where(mask, self.bag_pos + 1, self.bag_pos)
+        self.rotation[mask] = 0
+        self.col[mask] = self.width // 2 - 1 + SPAWN[self.kind[mask], 0]
+        self.row[mask] = self.height + 1 + SPAWN[self.kind[mask], 1]
+        return mask & ~self.fits(self.rotation, self.col, self.row)
+
+    def cells(self, rotation, col, row):
+        """(N, 4) columns and rows of every board's piece at the given placement"""
+        offsets = CELLS[self.kind, rotation]
+        return col[:, None] + offsets[..., 0], row[:, None] + offsets[..., 1]
+
+    def fits(self, rotation, col, row):
+        """Per board: cells inside the walls and above the floor, not on landed cells"""
+        cols, rows = self.cells(rotation, col, row)
+        inside = (cols >= 0) & (cols < self.width) & (rows >= 0)
+        landed = self.boards[self.index[:, None], np.clip(rows, 0, self.height - 1),
+                             np.clip(cols, 0, self.width - 1)]
+        return (inside & ~(landed & (rows < self.height))).all(axis=1)
+
+    def shift(self, mask, dc=0, dr=0):
+        """Moves the pieces in `mask` where the move fits, returns the boards that moved"""
+        moved = mask & self.fits(self.rotation, self.col + dc, self.row + dr)
+        self.col += dc * moved
+        self.row += dr * moved
+        return moved
+
+    def rotate(self, mask):
+        """Clockwise turn trying each wall kick in order, like `Engine.rotate`"""
+        turned = (self.rotation + 1) % 4
+        pending = mask.copy()
+        for k in range(KICK_TABLE.shape[2]):
+            kick = KICK_TABLE[self.kind, self.rotation, k]
+            ok = pending & self.fits(turned, self.col + kick[:, 0], self.row + kick[:, 1])
+            self.col += kick[:, 0] * ok
+            self.row += kick[:, 1] * ok
+            self.rotation = np.where(ok, turned, self.rotation)
+            pending &= ~ok
+
+    def lock(self, mask):
+        """Lands the pieces in `mask`, clears lines; returns lines cleared and lost games"""
+        cols, rows = self.cells(self.rotation, self.col, self.row)
+        visible = mask[:, None] & (rows < self.height)
+        board_index = np.broadcast_to(self.index[:, None], rows.shape)
+        self.boards[board_index[visible], rows[visible], cols[visible]] = True
+
+        lines = np.zeros(self.num, dtype=np.int64)
+        if mask.any():
+            self.boards[mask], lines[mask] = clear_full_rows(self.boards[mask])
+        self.lines += lines
+        self.score += SCORES[lines]
+        self.pieces += mask
+        lost = mask & self.boards[:, -1].any(axis=1)
+        lost |= self.spawn(mask & ~lost)
+        return lines, lost
+
+    def step(self, actions):
+        actions = np.broadcast_to(np.asarray(actions), (self.num, ))
+        self.shift(actions == LEFT, dc=-1)
+        self.shift(actions == RIGHT, dc=1)
+        self.rotate(actions == ROTATE)
+        self.shift(actions == DOWN, dr=-1)
+
+        # hard drops fall until every one of them is blocked, then gravity moves the rest a row
+        dropping = actions == HARD_DROP
+        while dropping.any():
+            dropping = self.shift(dropping, dr=-1)
+        falling = actions != HARD_DROP
+        locking = ~self.shift(falling, dr=-1)
+
+        lines, dones = self.lock(locking)
+        rewards = SCORES[lines].astype(np.float32)
+        info = {"lines": lines, "score": self.score.copy(), "pieces": self.pieces.copy()}
+        if dones.any():
+            self.restart(dones)
+        return self.observe(), rewards, dones, info
+
+    def observe(self):
+        obs = self.boards.astype(np.uint8)
+        cols, rows = self.cells(self.rotation, self.col, self.row)
+        visible = rows < self.height
+        board_index = np.broadcast_to(self.index[:, None], rows.shape)
+        obs[board_index[visible], rows[visible], cols[visible]] = 2
+        return obs
@@ -0,0 +1,405 @@
+"""Renderer-free Tetris rules.
+
+Everything here works in grid units (row 0 is the bottom row, col 0 the
+left column) and never touches turtle or Tk, so whole games can be
+simulated in tests, benchmarks and bots. `World` in gameplay.py is the
+turtle adapter drawing an `Engine`.
+"""
+import random
+from functools import lru_cache
+
+from randomizer import Randomizer, MASK64
+
+# kind -> (box size, box corner relative to the spawn cell, cells inside the box)
+SHAPES = {
+    "I": (4, (0, -2), ((0, 2), (1, 2), (2, 2), (3, 2))),
+    "J": (3, (0, -2), ((0, 2), (0, 1), (1, 1), (2, 1))),
+    "L": (3, (-2, -2), ((2, 2), (0, 1), (1, 1), (2, 1))),
+    "S": (3, (-1, -2), ((1, 2), (2, 2), (0, 1), (1, 1))),
+    "Z": (3, (0, -2), ((0, 2), (1, 2), (1, 1), (2, 1))),
+    "O": (2, (0, -1), ((0, 1), (1, 1), (0, 0), (1, 0))),
+    "T": (3, (-1, -2), ((1, 2), (0, 1), (1, 1), (2, 1))),
+}
+SHAPE_ORDER = ("I", "J", "L", "S", "Z", "O", "T")
+COLORS = {"I": "lightblue", "J": "blue", "L": "orange", "S": "green",
+          "Z": "red", "O": "yellow", "T": "purple"}
+LANDED_COLOR = "gray"       # landed cells whose piece isn't known, e.g. after restoring a snapshot
+LINE_SCORES = (0, 100, 300, 500, 800)
+GARBAGE_LINES = (0, 0, 1, 2, 4)     # garbage sent to a versus opponent per lines cleared at once
+
+# clockwise wall kicks (dcol, drow) tried in order, indexed by the rotation turned from
+JLSTZ_KICKS = (((0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)),
+               ((0, 0), (1, 0), (1, -1), (0, 2), (1, 2)),
+               ((0, 0), (1, 0), (1, 1), (0, -2), (1, -2)),
+               ((0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)))
+I_KICKS = (((0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)),
+           ((0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)),
+           ((0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)),
+           ((0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)))
+O_KICKS = (((0, 0), ), ) * 4
+KICKS = {kind: I_KICKS if kind == "I" else O_KICKS if kind == "O" else JLSTZ_KICKS
+         for kind in SHAPE_ORDER}
+
+
+def build_orientations(size, offsets):
+    """The four clockwise quarter turns of `offsets` around the center of their box"""
+    turns = [tuple(offsets)]
+    for _ in range(3):
+        turns.append(tuple((r, size - 1 - c) for c, r in turns[-1]))
+    return tuple(turns)
+
+
+def build_masks(offsets):
+    """(min col, max col, min row, ((row, bits), ...)) with bit 0 at the min col"""
+    min_c = min(c for c, _ in offsets)
+    max_c = max(c for c, _ in offsets)
+    min_r = min(r for _, r in offsets)
+    rows = {}
+    for c, r in offsets:
+        rows[r] = rows.get(r, 0) | 1 << (c - min_c)
+    return min_c, max_c, min_r, tuple(sorted(rows.items()))
+
+
+def build_columns(offsets):
+    """((col, lowest row, highest row), ...) for every column the cells cover"""
+    columns = {}
+    for c, r in offsets:
+        low, high = columns.get(c, (r, r))
+        columns[c] = min(low, r), max(high, r)
+    return tuple((c, low, high) for c, (low, high) in sorted(columns.items()))
+
+
+ORIENTATIONS = {kind: build_orientations(size, offsets) for kind, (size, _, offsets) in SHAPES.items()}
+MASKS = {kind: tuple(build_masks(turn) for turn in turns) for kind, turns in ORIENTATIONS.items()}
+COLUMNS = {kind: tuple(build_columns(turn) for turn in turns) for kind, turns in ORIENTATIONS.items()}
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(height):
+    """A fixed random 64-bit key per row"""
+    rng = random.Random(f"zobrist/{height}")
+    return tuple(rng.getrandbits(64) for _ in range(height))
+
+
+def row_hash(key, mask) -> int:
+    """Zobrist key of one row holding `mask`: the row's key and the mask mixed by a
+    multiply-xorshift. Empty rows count as 0, so a line clear only rehashes the rows it moves."""
+    if not mask:
+        return 0
+    z = (key ^ mask) * 0x9E3779B97F4A7C15 & MASK64
+    return z ^ z >> 29
+
+
+class Piece:
+    """The active piece: its kind, rotation and the bottom-left corner of its box"""
+
+    def __init__(self, kind, col, row, rotation=0):
+        self.kind = kind
+        self.col = col
+        self.row = row
+        self.rotation = rotation
+
+    def cells(self, col=None, row=None, rotation=None):
+        """(col, row) of every cell, optionally at another position/rotation"""
+        col = self.col if col is None else col
+        row = self.row if row is None else row
+        rotation = self.rotation if rotation is None else rotation
+        return [(col + c, row + r) for c, r in ORIENTATIONS[self.kind][rotation % 4]]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.kind!r}, {self.col}, {self.row}, {self.rotation})"
+
+
+class Board:
+    """Landed cells as one bitmask per row: bit c of rows[r] is column c of row r.
+
+    `heights[c]` is one above the highest landed cell of column c (0 when empty).
+    `hash` is a Zobrist hash of the landed cells: the XOR of one key per
+    (row, row mask), updated row by row on every placed piece and line clear, so
+    equal boards can be looked up in O(1).
+    """
+
+    def __init__(self, width=10, height=20):
+        self.width = width
+        self.height = height
+        self.full_row = (1 << width) - 1
+        self.rows = [0] * height
+        self.heights = [0] * width
+        self.keys = zobrist_keys(height)
+        self.rehash()
+
+    def reset(self):
+        self.rows = [0] * self.height
+        self.heights = [0] * self.width
+        self.rehash()
+
+    def rehash(self):
+        """Recomputes `hash` from scratch, needed only after assigning `rows` directly"""
+        h = 0
+        for key, mask in zip(self.keys, self.rows):
+            h ^= row_hash(key, mask)
+        self.hash = h
+
+    def update_heights(self):
+        """Rescans the column heights from the top row down"""
+        heights = [0] * self.width
+        seen, full = 0, self.full_row
+        for row in range(self.height - 1, -1, -1):
+            new = self.rows[row] & ~seen
+            while new:
+                bit = new & -new
+                heights[bit.bit_length() - 1] = row + 1
+                new ^= bit
+            seen |= self.rows[row]
+            if seen == full:
+                break
+        self.heights = heights
+
+    @property
+    def state_matrix(self):
+        """0/1 grid view of the row masks, row 0 being the bottom row"""
+        return [[mask >> col & 1 for col in range(self.width)] for mask in self.rows]
+
+    def fits(self, cells) -> bool:
+        """Cells may stick out above the top, never through the walls or the floor"""
+        rows, width, height = self.rows, self.width, self.height
+        for col, row in cells:
+            if row < 0 or not 0 <= col < width:
+                return False
+            if row < height and rows[row] >> col & 1:
+                return False
+        return True
+
+    def fits_piece(self, kind, rotation, col, row) -> bool:
+        """Same as `fits` for a piece, tested row mask against row mask"""
+        min_c, max_c, min_r, masks = MASKS[kind][rotation]
+        left = col + min_c
+        if left < 0 or col + max_c >= self.width or row + min_r < 0:
+            return False
+        rows, height = self.rows, self.height
+        for dr, bits in masks:
+            r = row + dr
+            if r < height and rows[r] & bits << left:
+                return False
+        return True
+
+    def place_piece(self, kind, rotation, col, row):
+        """Marks the piece's cells as landed, the ones above the top are dropped"""
+        min_c, _, _, masks = MASKS[kind][rotation]
+        left = col + min_c
+        for dr, bits in masks:
+            r = row + dr
+            if r < self.height:
+                mask = self.rows[r]
+                self.rows[r] = mask | bits << left
+                self.hash ^= row_hash(self.keys[r], mask) ^ row_hash(self.keys[r], self.rows[r])
+        heights = self.heights
+        for c, low, high in COLUMNS[kind][rotation]:
+            top = min(row + high + 1, self.height)
+            if top > heights[col + c] and row + low < self.height:
+                heights[col + c] = top
+
+    def landing_row(self, kind, rotation, col, row) -> int:
+        """Lowest row a piece falls to from `row`, read off the column heights"""
+        heights = self.heights
+        landing = max(heights[col + c] - low for c, low, _ in COLUMNS[kind][rotation])
+        if landing <= row:
+            return landing
+        # the piece is tucked under an overhang: step down through its cave
+        while self.fits_piece(kind, rotation, col, row - 1):
+            row -= 1
+        return row
+
+    def add_garbage(self, count, hole) -> bool:
+        """Pushes the stack up `count` rows and fills the bottom ones but for column `hole`.
+
+        Returns False when landed cells were pushed out of the top.
+        """
+        count = min(count, self.height)
+        overflow = any(self.rows[self.height - count:])
+        self.rows = [self.full_row & ~(1 << hole)] * count + self.rows[:self.height - count]
+        self.update_heights()
+        self.rehash()
+        return not overflow
+
+    def clear_lines(self, touched=None):
+        """Compacts the rows in one bottom-up pass, moving whole row masks down.
+
+        `touched`, the rows a piece just landed in, are the only ones that can
+        have filled up: with it, a lock without a full row costs nothing and
+        the pass starts at the lowest full row instead of the floor.
+        Returns the removed row indices and the (from, to) rows that moved.
+        """
+        rows, full = self.rows, self.full_row
+        if touched is not None:
+            touched = [row for row in touched if 0 <= row < self.height and rows[row] == full]
+            if not touched:
+                return [], []
+        start = min(touched) if touched else 0
+        top = max(self.heights)
+        cleared, moved = [], []
+        to = start
+        for row in range(start, top):
+            mask = rows[row]
+            if mask == full:
+                cleared.append(row)
+                continue
+            if to != row:
+                rows[to] = mask
+                if mask:
+                    moved.append((row, to))
+            to += 1
+        if cleared:
+            for row in range(to, top):
+                rows[row] = 0
+            self.update_heights()
+            keys, h = self.keys, self.hash
+            for row in cleared:
+                h ^= row_hash(keys[row], full)
+            for src, dst in moved:
+                mask = rows[dst]
+                h ^= row_hash(keys[src], mask) ^ row_hash(keys[dst], mask)
+            self.hash = h
+        return cleared, moved
+
+
+class Engine:
+    """One game: board, active piece, gravity, locking, line clears and score.
+
+    Pieces come from a per-game `Randomizer`; the same seed (and bag setting)
+    always deals the same game.
+    """
+
+    def __init__(self, width=10, height=20, seed=None, bag=True):
+        self.board = Board(width, height)
+        self.bag = bag
+        self.piece = None
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Starts a new game, from `seed` or from a fresh random one"""
+        self.board.reset()
+        self.shapes = Randomizer(SHAPE_ORDER, seed, self.bag)
+        self.seed = self.shapes.seed
+        self.score = 0
+        self.lines = 0
+        self.pieces = 0
+        self.ticks = 0
+        self.cleared = []       # rows removed by the last lock
+        self.moved = []         # (from, to) rows shifted down by the last lock
+        self.incoming = []      # versus garbage (count, hole) waiting for the next lock
+        self.raised = 0         # rows of garbage the last lock pushed under the stack
+        self.sent = 0           # garbage lines sent to the opponent so far
+        self.over = False
+        self.ghost = None
+        self.spawn()
+
+    @property
+    def level(self) -> int:
+        """Starts at 1 and goes up every 10 cleared lines"""
+        return self.lines // 10 + 1
+
+    def spawn(self) -> bool:
+        """Puts the next piece above the board, centered like the original game"""
+        kind = next(self.shapes)
+        _, (dc, dr), _ = SHAPES[kind]
+        self.piece = Piece(kind, self.board.width // 2 - 1 + dc, self.board.height + 1 + dr)
+        self.ghost = None
+        if not self.board.fits_piece(kind, 0, self.piece.col, self.piece.row):
+            self.over = True
+        return not self.over
+
+    def try_move(self, dc=0, dr=0, turns=0) -> bool:
+        piece = self.piece
+        if self.over:
+            return False
+        rotation = (piece.rotation + turns) % 4
+        if not self.board.fits_piece(piece.kind, rotation, piece.col + dc, piece.row + dr):
+            return False
+        piece.col += dc
+        piece.row += dr
+        piece.rotation = rotation
+        if dc or turns:
+            self.ghost = None
+        return True
+
+    def left(self) -> bool:
+        return self.try_move(dc=-1)
+
+    def right(self) -> bool:
+        return self.try_move(dc=1)
+
+    def rotate(self) -> bool:
+        """Turns the piece clockwise, trying each wall kick until one fits"""
+        piece = self.piece
+        for dc, dr in KICKS[piece.kind][piece.rotation]:
+            if self.try_move(dc, dr, 1):
+                return True
+        return False
+
+    def down(self) -> bool:
+        """Moves the piece a row down, locks it (and returns False) when it can't"""
+        if self.try_move(dr=-1):
+            return True
+        if not self.over:
+            self.lock()
+        return False
+
+    def step(self) -> bool:
+        """One gravity tick"""
+        self.ticks += 1
+        return self.down()
+
+    @property
+    def ghost_row(self) -> int:
+        """Row the active piece would land on, cached until the piece or the board changes"""
+        if self.ghost is None:
+            piece = self.piece
+            self.ghost = self.board.landing_row(piece.kind, piece.rotation, piece.col, piece.row)
+        return self.ghost
+
+    def ghost_cells(self):
+        return self.piece.cells(row=self.ghost_row)
+
+    def hard_drop(self):
+        if not self.over:
+            self.piece.row = self.ghost_row
+            self.lock()
+
+    def lock(self):
+        """Lands the piece, clears full rows and spawns the next piece"""
+        piece = self.piece
+        self.board.place_piece(piece.kind, piece.rotation, piece.col, piece.row)
+        _, _, min_r, masks = MASKS[piece.kind][piece.rotation]
+        self.cleared, self.moved = self.board.clear_lines(range(piece.row + min_r, piece.row + masks[-1][0] + 1))
+        self.lines += len(self.cleared)
+        self.score += LINE_SCORES[len(self.cleared)]
+        self.pieces += 1
+        overflow = self.settle_garbage(GARBAGE_LINES[len(self.cleared)])
+        if overflow or self.board.rows[-1]:
+            self.over = True
+        else:
+            self.spawn()
+
+    def settle_garbage(self, attack) -> bool:
+        """Versus rules after a lock: `attack` lines first cancel incoming garbage, the rest
+        are sent; a lock that cleared nothing takes the incoming garbage. True on overflow."""
+        incoming = self.incoming
+        while attack and incoming:
+            count, hole = incoming[0]
+            cancel = min(count, attack)
+            attack -= cancel
+            if cancel == count:
+                incoming.pop(0)
+            else:
+                incoming[0] = count - cancel, hole
+        self.sent += attack
+        self.raised = 0
+        overflow = False
+        if incoming and not self.cleared:
+            for count, hole in incoming:
+                overflow |= not self.board.add_garbage(count, hole)
+                self.raised += count
+            self.raised = min(self.raised, self.board.height)
+            incoming.clear()
+        return overflow
@@ -0,0 +1,101 @@
+"""Fixed-timestep game loop on top of Tk timers.
+
+Tk's `after` fires late by however long the previous callback ran, so a loop
+that simply reschedules itself drifts. `GameLoop` instead measures real time
+with a monotonic clock and runs as many fixed steps as have elapsed.
+"""
+import time
+
+# gravity period per level (level 1 first); levels past the end keep the last one
+GRAVITY_MS = (400, 350, 300, 260, 220, 185, 150, 120, 100, 80, 65, 50)
+
+
+def gravity_ms(level: int) -> int:
+    return GRAVITY_MS[min(max(level, 1), len(GRAVITY_MS)) - 1]
+
+
+class Timer:
+    """Cancellable handle on a Tk `after` callback"""
+
+    def __init__(self, widget, ms, callback):
+        self.widget = widget
+        self.callback = callback
+        self.id = widget.after(ms, self.fire)
+
+    @property
+    def active(self) -> bool:
+        return self.id is not None
+
+    def fire(self):
+        self.id = None
+        self.callback()
+
+    def cancel(self):
+        if self.id is not None:
+            self.widget.after_cancel(self.id)
+            self.id = None
+
+
+class GameLoop:
+    """Calls `step` once every `period_ms` of real time.
+
+    A frame is scheduled every `frame_ms`; it adds the time that really passed
+    to `lag` and runs one step per full period in it. When rendering falls
+    behind, the next frame catches up with several steps (at most
+    `max_catch_up`, the rest of a long stall is dropped), so the game speed
+    never depends on the frame time. `on_frame` runs after the steps.
+    """
+
+    def __init__(self, widget, step, period_ms=400, frame_ms=16, max_catch_up=5,
+                 on_frame=None, clock=time.monotonic):
+        self.widget = widget
+        self.step = step
+        self.period_ms = period_ms
+        self.frame_ms = frame_ms
+        self.max_catch_up = max_catch_up
+        self.on_frame = on_frame
+        self.clock = clock
+        self.timer = None
+        self.last = None
+        self.lag = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self.timer is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.last = self.clock()
+        self.timer = Timer(self.widget, self.frame_ms, self.frame)
+
+    def stop(self):
+        """Cancels the pending frame, so play/pause can never stack timers"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def reset(self):
+        self.stop()
+        self.lag = 0.0
+
+    def frame(self):
+        now = self.clock()
+        self.lag += (now - self.last) * 1000
+        self.last = now
+
+        steps = 0
+        while self.lag >= self.period_ms and steps < self.max_catch_up:
+            self.lag -= self.period_ms
+            steps += 1
+            self.step()
+            if self.timer is None:      # the step stopped the loop
+                return
+        if self.lag >= self.period_ms:
+            self.lag %= self.period_ms
+
+        if self.on_frame:
+            self.on_frame()
+            if self.timer is None:      # on_frame stopped the loop
+                return
+        self.timer = Timer(self.widget, self.frame_ms, self.frame)
@@ -1,206 +1,397 @@
 import turtle as tt
-from itertools import cycle
+from contextlib import nullcontext
 from tetris_shape import I, J, L, S, Z, O, T
 from tetris_Movement import Tetromino, Cell
-
-SHAPE_CLASSES = cycle((I, J, L, S, Z, O, T))
-
-class World(Tetromino):
-    """Represents the tetris world defined by a grid of 20x10 (visible) cells"""
-
-    def __init__(self, size=20, screen=None):
-        super().__init__(size, screen)
-        self.screen = self.pen.getscreen()
-        self.stack = Stack(self)
-        self.tetro = None
-        self.running = False        # NEW: gate the game loop
-        self.tick_ms = 400          # NEW: loop interval
-        self.init_screen()
-
-    def init_screen(self, **settings):
-        s = self.size
-        x1, y1, xu, yu = -5, 0, 15, 20
-        self.screen.setworldcoordinates(x1 * s, y1 * s, xu * s, yu * s)
-        self.screen.bgcolor("#C6DEF1")
-        self.draw(0, s, "#FAEDCB")
-        self.spawn()
-
-    def draw(self, x, y, color=""):
-        """Draws the world, a 20x10 grid"""
-        for row in range(20):
-            for col in range(10):
-                super().draw(x, y, color)
-                x += self.size
-            x, y = 0, y + self.size
-        self.screen.update()
-
-    def spawn(self):
-        """create a new/active tetro"""
-        self.tetro = next(SHAPE_CLASSES)(self.size, self.screen)
-        x, y = 4 * self.size, 22 * self.size
-        self.tetro.draw(x, y)
-        self.screen.update()
+from engine import Engine, SHAPES, COLORS, LANDED_COLOR
+from game_loop import GameLoop, gravity_ms
+from replay import Recorder, ReplayError
+from input_buffer import InputBuffer
+from profiler import ProfiledView
+from snapshot import snapshot, restore, SnapshotError
+
+UNTIMED = nullcontext()
+
+SHAPE_CLASSES = {"I": I, "J": J, "L": L, "S": S, "Z": Z, "O": O, "T": T}
+
+class World:
+    """A game of tetris: the `Engine`, the loop driving it and the view drawing it.
+
+    The view defaults to turtle graphics (`TurtleView`), any object with the same
+    attach/reset/spawn/show_piece/landed/game_over methods can replace it.
+    """
+
+    def __init__(self, size=20, screen=None, view=None, seed=None, width=10, height=20):
+        self.size = size
+        self.screen = screen or tt.getscreen()
+        self.engine = Engine(width, height, seed=seed)
+        self.recorder = Recorder(self.engine)
+        self.view = view or TurtleView(self)
+        self.level = self.engine.level
+        self.inputs = InputBuffer()
+        self.loop = GameLoop(self.screen.getcanvas(), self.tick, period_ms=gravity_ms(self.level),
+                             on_frame=self.frame)
+        self.on_score = None        # called with the engine whenever score, lines or level change
+        self.bot = None             # an `AutoPlayer` playing instead of the player
+        self.profiler = None        # a `FrameProfiler` timing every frame
+        self.versus = None          # a `VersusLink` to the opponent of a versus game
+        self.view.attach(self.engine)
+        self.view.reset()
+
+    @property
+    def running(self):
+        return self.loop.running
 
     def move(self, instr="down"):
-        if any(self.stack.state_matrix[19]):
-            self.game_over()
-            return
+        if self.apply(instr):
+            self.view.show_piece()
 
-        temp_cells = []
-        for cell in self.tetro.cells:
-            new_cell = Cell(self.size, cell.color, cell.pen, *cell.points)
-            if instr == "down":
-                new_cell.translate_y(-1)
-            elif instr == "left":
-                new_cell.translate_x(-1)
-            elif instr == "right":
-                new_cell.translate_x(1)
-            elif instr == "rotate":
-                new_cell = new_cell * self.tetro.rot_center
-
-            temp_cells.append(new_cell)
-
-        if self.stack.ok_move(temp_cells, self.tetro):
-            getattr(self.tetro, instr)()
-        else:
-            if instr == "down":
-                self.stack.absorb(*self.tetro.cells, tetro=self.tetro)
-                self.stack.request_tetro()
+    def apply(self, instr):
+        """Applies one input to the engine without drawing the piece; True if it moved.
+        A lock still goes through `landed`, which shows the next piece."""
+        if self.engine.over:
+            self.game_over()
+            return False
+
+        piece, pieces = self.engine.piece, self.engine.pieces
+        if getattr(self.engine, instr)():
+            self.recorded(instr)
+            return True
+        if self.engine.pieces != pieces:
+            self.recorded(instr)
+            self.landed(piece)
+        return False
+
+    def run(self, actions):
+        """Applies a batch of inputs, then draws the active piece once"""
+        moved = False
+        for action in actions:
+            if self.engine.over:
+                break
+            pieces = self.engine.pieces
+            if action == "hard_drop":
+                self.hard_drop()
+            else:
+                moved |= self.apply(action)
+            if self.engine.pieces != pieces:
+                moved = False       # `landed` has shown the next piece
+        if moved:
+            self.view.show_piece()
 
-        self.tetro.draw_bounds()
+    def recorded(self, instr):
+        """Logs a player input that changed the game (gravity steps are implied by ticks)"""
+        if instr != "step":
+            self.recorder.record(instr)
 
     def hard_drop(self):
-        """While ok drop current tetro by a cell"""
-        while True:
-            temp_cells = []
-            for cell in self.tetro.cells:
-                new_cell = Cell(self.size, cell.color, cell.pen, *cell.points)
-                new_cell.translate_y(-1)
-                temp_cells.append(new_cell)
-
-            if self.stack.ok_move(temp_cells, self.tetro):
-                self.tetro.down()
-            else:
-                self.stack.absorb(*self.tetro.cells, tetro=self.tetro)
-                self.stack.request_tetro()
-                break
-
-        self.screen.update()
+        """Drops the current tetro as far as it goes and locks it"""
+        if self.engine.over:
+            return
+        piece = self.engine.piece
+        self.recorded("hard_drop")
+        self.engine.hard_drop()
+        self.landed(piece)
+
+    def landed(self, piece):
+        """Lets the view absorb a locked piece, then spawns the next one"""
+        self.view.landed(piece)
+        self.update_score(len(self.engine.cleared))
+        if self.engine.over:
+            self.game_over()
+        else:
+            self.view.spawn()
 
     # ---------- NEW: controlled game loop ----------
     def play(self):
         """Start or resume the game loop."""
-        if self.running:
-            return
-        self.running = True
-        self.screen.ontimer(self.tick, self.tick_ms)
+        if not self.engine.over:
+            self.inputs.clear()
+            if self.profiler:
+                self.profiler.restart()
+            self.loop.start()
 
     def pause(self):
         """Pause the game loop."""
-        self.running = False
-        # No timer cancel in turtle; gating via `running` stops re-scheduling.
-
-    def stop(self):
-        """Stop the game and reset world and stack."""
-        self.running = False
-        self.pen.clear()
-        self.stack.cells.clear()
-        self.stack.init_state_matrix()
-        self.tetro = None
-        self.init_screen()
+        self.loop.stop()
+
+    def stop(self, seed=None):
+        """Stop the game and reset world and stack, starting over from `seed` if given."""
+        self.loop.reset()
+        self.engine.reset(seed)
+        self.recorder.reset()
+        self.view.reset()
+        self.update_score(0)
+        if self.versus:
+            self.versus.reset()
 
     def tick(self):
-        """One loop iteration. Reschedules only if running."""
-        if not self.running:
-            return
-        # Advance game one step
-        self.move("down")
-        # Schedule next tick
-        self.screen.ontimer(self.tick, self.tick_ms)
+        """One gravity step, run by the loop at the current level's speed; the bot plays first."""
+        with self.timed("logic"):
+            if self.bot:
+                self.bot_turn()
+            # the bot's piece falls a row too, so ticks (and replay timing) go on under autoplay
+            self.move("step")
+
+    def frame(self):
+        """Runs once per loop frame, after the frame's gravity steps"""
+        with self.timed("logic"):
+            self.handle_inputs()
+        if self.versus:
+            self.versus.sync()
+        if self.profiler:
+            with self.profiler.section("update"):
+                self.screen.update()
+            self.profiler.end_frame()
+
+    def handle_inputs(self):
+        """Applies the player's buffered key actions, once per frame and drawn once"""
+        actions = self.inputs.drain()
+        if not self.bot:
+            self.run(actions)
     # ---------- END NEW ----------
 
+    def profile(self, profiler=None):
+        """Times every frame into `profiler` (a `FrameProfiler`), None turns timing off"""
+        if isinstance(self.view, ProfiledView):
+            self.view = self.view.view
+        if profiler:
+            self.view = ProfiledView(self.view, profiler)
+        self.profiler = profiler
+
+    def timed(self, field):
+        return self.profiler.section(field) if self.profiler else UNTIMED
+
+    def autoplay(self, bot=None):
+        """Lets `bot` play from the next tick on, None hands the game back to the player"""
+        self.bot = bot
+
+    def bot_turn(self):
+        """The bot moves and drops the active piece, one piece per tick"""
+        self.run(self.bot_moves())
+
+    def bot_moves(self):
+        pieces = self.engine.pieces
+        while self.engine.pieces == pieces and not self.engine.over:
+            yield self.bot.next_move(self.engine)
+
+    def save_replay(self, path):
+        """Writes the inputs of the game so far as a binary replay"""
+        if self.versus:
+            raise ReplayError("a versus game can't be replayed: the opponent's garbage isn't recorded")
+        self.recorder.finish().save(path)
+
+    def snapshot(self) -> bytes:
+        """The whole game state in a few hundred bytes, see snapshot.py"""
+        if self.versus:
+            raise SnapshotError("a versus game can't be snapshotted: garbage in flight isn't saved")
+        return snapshot(self.engine)
+
+    def restore(self, data: bytes):
+        """Continues from a snapshot of a game on a board of the same size, paused.
+
+        The game no longer follows from its seed alone, so `save_replay` raises
+        ReplayError until the next `stop()` starts a new game.
+        """
+        if self.versus:
+            raise SnapshotError("a versus game can't be restored, the opponent's copy would differ")
+        if restore(data, self.engine) is not self.engine:
+            raise SnapshotError("the snapshot's board size differs from this world's")
+        self.loop.reset()
+        self.recorder.reset(restored=True)
+        self.view.reset()
+        self.update_score(0)
+        if self.engine.over:
+            self.game_over()
+
+    def connect(self, link):
+        """Plays a versus game over `link` (a `VersusLink` on this world's engine)"""
+        self.versus = link
+
     def game_over(self):
         self.pause()
-        self.pen.penup()
-        self.pen.goto(5 * self.size, 10 * self.size)
-        self.pen.color("white")
-        self.pen.write("GAME OVER!", align="center", font=("Arial", 40, "bold"))
-        self.screen.update()
+        if self.versus:
+            self.versus.sync()      # the loop is stopped: tell the opponent now
+        self.view.game_over()
         print("Game Over!")
 
     def update_score(self, lines):
         if lines:
             print(f"Cleared {lines} lines")
+        if self.engine.level != self.level:
+            self.level = self.engine.level
+            self.loop.period_ms = gravity_ms(self.level)
+        if self.on_score:
+            self.on_score(self.engine)
 
 
-class Stack(Tetromino):
+class TurtleView(Tetromino):
+    """Turtle view of an `Engine`: the board's grid of cells, the stack and the active tetro"""
+
     def __init__(self, world: World):
         super().__init__(world.size, world.screen)
-        self.state_matrix = None
-        self.world = world
-        self.cells = []
-        self.init_state_matrix()
+        self.screen = world.screen
+        self.engine = None
+        self.stack = None
+        self.tetro = None
+
+    def attach(self, engine: Engine):
+        self.engine = engine
+        self.stack = Stack(self)
+
+    def reset(self):
+        self.pen.clear()
+        self.stack.clear()
+        if self.tetro:
+            self.tetro.clear()
+        self.init_screen()
+        self.stack.absorb(*self.stack.landed_cells())
+
+    def init_screen(self, **settings):
+        s, width, height = self.size, self.engine.board.width, self.engine.board.height
+        # a square view, the board centered with a margin of half its width on each side
+        side = max(2 * width, height)
+        x1, y1 = (width - side) / 2, (height - side) / 2
+        self.screen.setworldcoordinates(x1 * s, y1 * s, (x1 + side) * s, (y1 + side) * s)
+        self.screen.bgcolor("#C6DEF1")
+        self.draw(0, s, "#FAEDCB")
+        self.spawn()
+
+    def draw(self, x, y, color=""):
+        """Draws the world: the board filled with `color` and its grid lines, (x, y) being
+        the top-left corner of the bottom-left cell. Costs one line per row and column."""
+        s, width, height = self.size, self.engine.board.width, self.engine.board.height
+        left, bottom = x, y - s
+        right, top = left + width * s, bottom + height * s
+        pen = self.pen
+        pen.pu()
+        pen.goto(left, bottom)
+        pen.fillcolor(color or self.color)
+        pen.pd()
+        pen.begin_fill()
+        for corner in ((right, bottom), (right, top), (left, top), (left, bottom)):
+            pen.goto(corner)
+        pen.end_fill()
+        for col in range(1, width):
+            pen.pu()
+            pen.goto(left + col * s, bottom)
+            pen.pd()
+            pen.goto(left + col * s, top)
+        for row in range(1, height):
+            pen.pu()
+            pen.goto(left, bottom + row * s)
+            pen.pd()
+            pen.goto(right, bottom + row * s)
+        self.screen.update()
+
+    def spawn(self):
+        """create the turtle tetro of the engine's active piece"""
+        self.tetro = SHAPE_CLASSES[self.engine.piece.kind](self.size, self.screen)
+        self.show_piece()
+
+    def show_piece(self):
+        """Moves the turtle tetro to where the engine has the active piece"""
+        piece = self.engine.piece
+        _, (dc, dr), _ = SHAPES[piece.kind]
+        self.tetro.start = (piece.col - dc) * self.size, (piece.row - dr + 1) * self.size
+        self.tetro.place(piece.cells(), COLORS[piece.kind])
+        self.tetro.draw_bounds()
+
+    def landed(self, piece):
+        """Hands a locked piece over to the stack"""
+        self.tetro.clear()
+        cells = self.tetro.grid_cells(piece.cells(), COLORS[piece.kind])
+        self.stack.absorb(*cells, cleared=self.engine.cleared, moved=self.engine.moved,
+                          raised=self.engine.raised)
+
+    def game_over(self):
+        board = self.engine.board
+        self.pen.penup()
+        self.pen.goto(board.width / 2 * self.size, board.height / 2 * self.size)
+        self.pen.color("white")
+        self.pen.write("GAME OVER!", align="center", font=("Arial", 40, "bold"))
+        self.screen.update()
+
+
+class Stack(Tetromino):
+    """Turtle view of the engine's board: the absorbed cells, one pen per row"""
+
+    def __init__(self, view: TurtleView):
+        super().__init__(view.size, view.screen)
+        self.view = view
+        self.board = view.engine.board
+        self.row_pens = [tt.RawTurtle(view.screen, visible=False) for _ in range(self.board.height)]
+        self.row_cells = [[] for _ in range(self.board.height)]
+
+    @property
+    def rows(self):
+        return self.board.rows
+
+    @property
+    def state_matrix(self):
+        return self.board.state_matrix
+
+    @property
+    def hash(self):
+        """Zobrist hash of the absorbed cells, updated by the board on every lock and clear"""
+        return self.board.hash
 
     def init_state_matrix(self):
-        self.state_matrix = [[0 for _ in range(10)] for _ in range(20)]
+        self.board.reset()
 
     def ok_move(self, cells: list[Cell], tetro: Tetromino, move="down") -> bool:
+        return self.board.fits([(cell.col, cell.row) for cell in cells])
+
+    def absorb(self, *cells, cleared=(), moved=(), raised=0):
+        """Draws the cells of a locked tetro into their rows, then applies the line clear
+        and the versus garbage pushed under the stack"""
         for cell in cells:
-            xl, yl, xh, yh = cell.get_bounds()
-            if xl < 0 or xh > self.size * 10 or yl < 0:
-                return False
-            for my_cell in self.cells:
-                mx, my, _, _ = my_cell.get_bounds()
-                if xl == mx and yl == my:
-                    return False
-        return True
-
-    def absorb(self, *cells, tetro: Tetromino = None):
-        for cell in cells:
-            xl, yl, _, _ = cell.get_bounds()
-            row = int(yl // self.size)
-            col = int(xl // self.size)
-            if 0 <= row < 20 and 0 <= col < 10:
-                self.state_matrix[row][col] = 1
-                self.cells.append(cell)
-
-        cleared = self.rearrange()
-        self.world.update_score(cleared)
-        self.redraw()
-
-    def request_tetro(self):
-        self.world.spawn()
-
-    def rearrange(self):
-        full_rows = [i for i, row in enumerate(self.state_matrix) if all(row)]
-        if not full_rows:
-            return 0
-
-        # Process from bottom to top
-        for r in sorted(full_rows, reverse=True):
-            self.state_matrix.pop(r)
-            self.state_matrix.insert(0, [0 for _ in range(10)])
-
-        new_cells = []
-        for cell in self.cells:
-            xl, yl, _, _ = cell.get_bounds()
-            row = int(yl // self.size)
-
-            if row in full_rows:
-                cell.pen.clear()
-                continue
-
-            # Drop by number of cleared rows below
-            drop = sum(1 for r in full_rows if r < row)
-            if drop > 0:
-                cell.translate_y(-drop)
-
-            new_cells.append(cell)
-
-        self.cells = new_cells
-        self.pen.clear()
-        for cell in self.cells:
-            cell.draw()
+            if cell.row < self.board.height:
+                self.row_cells[cell.row].append(cell)
+                cell.draw(self.row_pens[cell.row], self.size)
+        if cleared:
+            self.rearrange(cleared, moved)
+        if raised:
+            self.raise_rows(raised)
         self.update_screen()
 
-        return len(full_rows)
+    def rearrange(self, cleared, moved):
+        """Shifts whole rows as the board did and redraws only the rows that changed"""
+        rows = self.row_cells
+        dirty = set(cleared)
+        for row in cleared:
+            rows[row] = []
+        for src, dst in moved:              # bottom-up, so `src` is never overwritten first
+            rows[dst], rows[src] = rows[src], []
+            for cell in rows[dst]:
+                cell.row = dst
+            dirty.update((src, dst))
+
+        for row in dirty:
+            pen = self.row_pens[row]
+            pen.clear()
+            for cell in rows[row]:
+                cell.draw(pen, self.size)
+
+    def raise_rows(self, count):
+        """Moves every row up `count` rows over the garbage rows the board put underneath"""
+        height = self.board.height
+        rows = [[] for _ in range(count)] + self.row_cells[:height - count]
+        for cell in self.landed_cells(count):
+            rows[cell.row].append(cell)
+        self.row_cells = rows
+        for row, (cells, pen) in enumerate(zip(rows, self.row_pens)):
+            pen.clear()
+            for cell in cells:
+                cell.row = row
+                cell.draw(pen, self.size)
+
+    def landed_cells(self, rows=None, color=LANDED_COLOR):
+        """Cells for whatever the board holds in its first `rows` rows (all by default),
+        e.g. after a snapshot was restored"""
+        width = self.board.width
+        return self.grid_cells([(col, row) for row, mask in enumerate(self.rows[:rows]) if mask
+                                for col in range(width) if mask >> col & 1], color)
+
+    def clear(self):
+        for row, pen in enumerate(self.row_pens):
+            pen.clear()
+            self.row_cells[row] = []
@@ -0,0 +1,66 @@
+"""Keyboard input buffered between frames, with DAS/ARR auto-repeat."""
+import time
+
+REPEATING = ("left", "right", "down")
+OPPOSITE = {"left": "right", "right": "left"}
+
+
+class InputBuffer:
+    """Key presses and releases queued by the Tk bindings and drained once per frame.
+
+    A tap gives one action. Holding left/right/down repeats it once `das_ms`
+    (delayed auto shift) have passed, then every `arr_ms` (auto repeat rate),
+    at most `max_repeat` times per frame; the direction pressed last wins.
+    The OS key repeat is ignored: presses of a key already down, and the
+    release/press pairs X11 sends for a held key, coalesce into the one hold.
+    """
+
+    def __init__(self, das_ms=170, arr_ms=50, max_repeat=10, clock=time.monotonic):
+        self.das_ms = das_ms
+        self.arr_ms = arr_ms
+        self.max_repeat = max_repeat
+        self.clock = clock
+        self.events = []        # (pressed, action, time) since the last drain
+        self.down = set()       # actions whose key is down
+        self.held = {}          # repeating action -> [time pressed, repeats done]
+
+    def press(self, action):
+        if self.events and self.events[-1][:2] == (False, action):
+            self.events.pop()       # auto-repeat release/press pair: the key never went up
+            return
+        self.events.append((True, action, self.clock()))
+
+    def release(self, action):
+        self.events.append((False, action, self.clock()))
+
+    def clear(self):
+        """Forgets queued events and held keys, e.g. across a pause"""
+        self.events.clear()
+        self.down.clear()
+        self.held.clear()
+
+    def drain(self) -> list:
+        """The actions of this frame: queued taps in order, then the due repeats"""
+        now = self.clock()
+        actions = []
+        for pressed, action, at in self.events:
+            if not pressed:
+                self.down.discard(action)
+                self.held.pop(action, None)
+            elif action not in self.down:
+                self.down.add(action)
+                actions.append(action)
+                if action in REPEATING:
+                    self.held.pop(OPPOSITE.get(action), None)
+                    self.held[action] = [at, 0]
+        self.events.clear()
+
+        for action, hold in self.held.items():
+            since, done = hold
+            elapsed = (now - since) * 1000 - self.das_ms
+            if elapsed < 0:
+                continue
+            due = int(elapsed // self.arr_ms) + 1 if self.arr_ms else done + self.max_repeat
+            actions.extend([action] * min(due - done, self.max_repeat))
+            hold[1] = due
+        return actions
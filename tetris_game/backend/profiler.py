@@ -0,0 +1,115 @@
+"""Optional per-frame timing of the game loop.
+
+`World.profile(FrameProfiler())` turns it on: game logic (gravity ticks and
+player inputs), rendering (every call into the view) and `screen.update()`
+are timed separately, one row per frame, in a ring buffer of the last
+`capacity` frames, along with the wall-clock interval since the previous
+frame.
+"""
+import csv
+import time
+from collections import deque
+
+FIELDS = ("logic_ms", "render_ms", "update_ms", "frame_ms", "interval_ms")
+
+
+class Section:
+    """Context manager adding the time spent inside it to one profiler field"""
+
+    __slots__ = ("profiler", "field", "start")
+
+    def __init__(self, profiler, field):
+        self.profiler = profiler
+        self.field = field
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+
+    def __exit__(self, *exc):
+        self.profiler.current[self.field] += self.profiler.clock() - self.start
+
+
+class FrameProfiler:
+    """Ring buffer of per-frame (logic, render, update, total, interval) times in ms.
+
+    Sections may nest: logic is measured around ticks and inputs, which call
+    into the view, so the render time spent inside is taken off the logic
+    time when the frame ends. What drops a frame is the Tk timer firing late,
+    whatever the cause, so a frame counts as dropped when its interval from
+    the previous frame is over 1.5 x `budget_ms` (the loop's frame period):
+    a display refresh went by without it.
+    """
+
+    def __init__(self, capacity=600, budget_ms=16, clock=time.perf_counter):
+        self.capacity = capacity
+        self.budget_ms = budget_ms
+        self.clock = clock
+        self.frames = deque(maxlen=capacity)
+        self.current = {"logic": 0.0, "render": 0.0, "update": 0.0}
+        self.sections = {field: Section(self, field) for field in self.current}
+        self.last_end = None
+
+    def section(self, field) -> Section:
+        return self.sections[field]
+
+    def end_frame(self):
+        """Stores the times gathered since the previous frame ended"""
+        t = self.current
+        now = self.clock()
+        render, update = t["render"] * 1000, t["update"] * 1000
+        logic = max(t["logic"] * 1000 - render, 0.0)
+        interval = (now - self.last_end) * 1000 if self.last_end is not None else 0.0
+        self.frames.append((logic, render, update, logic + render + update, interval))
+        t["logic"] = t["render"] = t["update"] = 0.0
+        self.last_end = now
+
+    def restart(self):
+        """Forgets when the last frame ended, e.g. after a pause, so the wait isn't a dropped frame"""
+        self.last_end = None
+
+    def column(self, field="frame_ms") -> list:
+        i = FIELDS.index(field)
+        return [frame[i] for frame in self.frames]
+
+    def percentile(self, p, field="frame_ms") -> float:
+        """Nearest-rank percentile of a field over the buffered frames"""
+        values = sorted(self.column(field))
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+
+    def summary(self) -> dict:
+        late = 1.5 * self.budget_ms
+        return {"frames": len(self.frames),
+                "p50_ms": self.percentile(50),
+                "p99_ms": self.percentile(99),
+                "dropped": sum(ms > late for ms in self.column("interval_ms"))}
+
+    def clear(self):
+        self.frames.clear()
+        self.last_end = None
+
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            writer.writerows([f"{ms:.4f}" for ms in frame] for frame in self.frames)
+
+
+class ProfiledView:
+    """Wraps a view so that every call into it is timed as render time"""
+
+    def __init__(self, view, profiler: FrameProfiler):
+        self.view = view
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        attr = getattr(self.view, name)
+        if not callable(attr):
+            return attr
+        section = self.profiler.section("render")
+
+        def timed(*args, **kwargs):
+            with section:
+                return attr(*args, **kwargs)
+        return timed
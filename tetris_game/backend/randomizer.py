@@ -0,0 +1,55 @@
+"""Seedable piece generators, one per game."""
+import os
+
+MASK64 = (1 << 64) - 1
+
+
+class Randomizer:
+    """Deterministic stream drawn from `kinds` (the shape kinds) by a 64-bit seed.
+
+    Runs its own xorshift64* generator instead of `random.Random`, so a seed
+    deals the same pieces on every Python version and the whole state fits in
+    a few bytes (replays keep the seed, snapshots the state). With `bag=True`
+    the pieces come in shuffled bags holding each kind once.
+    """
+
+    def __init__(self, kinds, seed=None, bag=True):
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little")
+        self.kinds = tuple(kinds)
+        self.seed = seed & MASK64
+        self.bag = bag
+        self.state = (self.seed ^ 0x9E3779B97F4A7C15) & MASK64 or 1
+        self.pending = []       # the rest of the current bag, dealt from the end
+
+    def next_int(self) -> int:
+        x = self.state
+        x ^= x >> 12
+        x ^= (x << 25) & MASK64
+        x ^= x >> 27
+        self.state = x
+        return (x * 0x2545F4914F6CDD1D) & MASK64
+
+    def below(self, n) -> int:
+        return (self.next_int() >> 32) % n
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.bag:
+            return self.kinds[self.below(len(self.kinds))]
+        if not self.pending:
+            bag = list(self.kinds)
+            for i in range(len(bag) - 1, 0, -1):
+                j = self.below(i + 1)
+                bag[i], bag[j] = bag[j], bag[i]
+            self.pending = bag
+        return self.pending.pop()
+
+    def peek(self):
+        """The kind `next` deals, without dealing it"""
+        state, pending = self.state, list(self.pending)
+        kind = next(self)
+        self.state, self.pending = state, pending
+        return kind
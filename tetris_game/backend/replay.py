@@ -0,0 +1,133 @@
+"""Input logs stamped with gravity ticks, and their compact binary format.
+
+A replay is the game's seed plus every player input with the number of
+gravity steps that had run before it. Playing it back on an `Engine` runs
+those steps and inputs again, headless and as fast as the CPU allows.
+
+Layout (little-endian): b"TRPL", version, flags (bit 0: 7-bag), width,
+height, seed (u64), end tick (u32), then one varint per input holding
+`ticks since the previous input << 3 | action`.
+"""
+import struct
+
+from engine import Engine
+
+MAGIC = b"TRPL"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHHQI")
+ACTIONS = ("left", "right", "rotate", "down", "hard_drop")     # Engine method names
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("replay ends inside an input")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """Seed, board size and the (tick, action) inputs of one game"""
+
+    def __init__(self, seed, width=10, height=20, bag=True, inputs=None, end_tick=0):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.bag = bag
+        self.inputs = inputs if inputs is not None else []
+        self.end_tick = end_tick
+
+    def to_bytes(self) -> bytes:
+        out = bytearray(HEADER.pack(MAGIC, VERSION, int(self.bag), self.width, self.height,
+                                    self.seed, self.end_tick))
+        last = 0
+        for tick, action in self.inputs:
+            write_varint(out, (tick - last) << 3 | ACTIONS.index(action))
+            last = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        if len(data) < HEADER.size:
+            raise ReplayError("replay header is truncated")
+        magic, version, flags, width, height, seed, end_tick = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError(f"not a version {VERSION} tetris replay")
+        inputs, tick, pos = [], 0, HEADER.size
+        while pos < len(data):
+            value, pos = read_varint(data, pos)
+            tick += value >> 3
+            if value & 7 >= len(ACTIONS):
+                raise ReplayError(f"unknown action code {value & 7}")
+            inputs.append((tick, ACTIONS[value & 7]))
+        return cls(seed, width, height, bool(flags & 1), inputs, end_tick)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path) -> "Replay":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def new_engine(self) -> Engine:
+        return Engine(self.width, self.height, seed=self.seed, bag=self.bag)
+
+    def play(self, engine=None) -> Engine:
+        """Runs the whole game headless and returns the engine at its end"""
+        engine = engine or self.new_engine()
+        for tick, action in self.inputs:
+            while engine.ticks < tick and not engine.over:
+                engine.step()
+            if engine.over:
+                return engine
+            getattr(engine, action)()
+        while engine.ticks < self.end_tick and not engine.over:
+            engine.step()
+        return engine
+
+
+class Recorder:
+    """Logs the inputs applied to an engine into a `Replay`"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.replay = None
+        self.restored = False
+        self.reset()
+
+    def reset(self, restored=False):
+        """Starts a new log for the engine's current game.
+
+        `restored` marks a game continued from a snapshot: it doesn't follow
+        from its seed, so `finish()` refuses to make a replay of it.
+        """
+        engine = self.engine
+        self.replay = Replay(engine.seed, engine.board.width, engine.board.height, engine.bag)
+        self.restored = restored
+
+    def record(self, action):
+        self.replay.inputs.append((self.engine.ticks, action))
+
+    def finish(self) -> Replay:
+        if self.restored:
+            raise ReplayError("a game restored from a snapshot can't be replayed from its seed")
+        self.replay.end_tick = self.engine.ticks
+        return self.replay
@@ -0,0 +1,123 @@
+"""Self-play tuning of the autoplayer weights.
+
+Headless games run on a process pool, one game per task, so a search uses
+every core. The search is a cross-entropy method: each generation samples
+weight vectors around a mean, plays every vector on the same seeds, and
+moves the mean/spread to the best ones. The search state is written to a
+JSON checkpoint after each generation and a run picks up from it.
+
+    python selfplay.py --generations 20 --checkpoint tuning.json
+"""
+import argparse
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import Engine
+from autoplayer import AutoPlayer, WEIGHTS
+
+
+def play_game(weights, seed, max_pieces, lookahead=False):
+    """(pieces, lines) of one headless game, run in a worker process"""
+    engine = Engine(seed=seed)
+    AutoPlayer(engine.board.width, weights, lookahead).play(engine, max_pieces)
+    return engine.pieces, engine.lines
+
+
+def evaluate(pool, candidates, seeds, max_pieces, lookahead=False):
+    """Mean pieces and lines of every weight vector over the same `seeds`"""
+    futures = [[pool.submit(play_game, weights, seed, max_pieces, lookahead) for seed in seeds]
+               for weights in candidates]
+    results = []
+    for games in futures:
+        pieces, lines = zip(*(future.result() for future in games))
+        results.append({"pieces": sum(pieces) / len(seeds), "lines": sum(lines) / len(seeds)})
+    return results
+
+
+class Search:
+    """Cross-entropy search state, round-tripping through a JSON checkpoint"""
+
+    def __init__(self, mean=WEIGHTS, std=None, generation=0, best=None, history=None, seed=0):
+        self.mean = list(mean)
+        self.std = list(std) if std else [0.5] * len(self.mean)
+        self.generation = generation
+        self.best = best            # {"weights", "pieces", "lines"} of the best vector so far
+        self.history = history if history is not None else []
+        self.seed = seed
+
+    def sample(self, count):
+        rng = random.Random(f"{self.seed}/{self.generation}")
+        return [[rng.gauss(m, s) for m, s in zip(self.mean, self.std)] for _ in range(count)]
+
+    def seeds(self, games):
+        """Game seeds of the current generation, shared by all its candidates"""
+        return [self.seed * 1_000_003 + self.generation * games + i for i in range(games)]
+
+    def update(self, candidates, results, elite=0.25, noise=0.05):
+        """Refits mean and spread to the elite candidates, ranked by lines then pieces"""
+        ranked = sorted(zip(candidates, results), key=lambda cr: (cr[1]["lines"], cr[1]["pieces"]),
+                        reverse=True)
+        top = ranked[:max(2, int(len(ranked) * elite))]
+        for i in range(len(self.mean)):
+            values = [weights[i] for weights, _ in top]
+            mean = sum(values) / len(values)
+            var = sum((v - mean) ** 2 for v in values) / len(values)
+            self.mean[i], self.std[i] = mean, (var + noise ** 2) ** 0.5
+
+        weights, result = ranked[0]
+        if not self.best or (result["lines"], result["pieces"]) > (self.best["lines"], self.best["pieces"]):
+            self.best = {"weights": weights, **result}
+        self.history.append({"generation": self.generation, "mean": list(self.mean), **result})
+        self.generation += 1
+
+    def save(self, path):
+        """Writes the checkpoint atomically, a crash never leaves half a file"""
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(vars(self), f, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path) -> "Search":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+def run(search, generations, population=24, games=8, max_pieces=2000, lookahead=False,
+        checkpoint=None, workers=None):
+    with ProcessPoolExecutor(workers) as pool:
+        while search.generation < generations:
+            candidates = search.sample(population)
+            results = evaluate(pool, candidates, search.seeds(games), max_pieces, lookahead)
+            search.update(candidates, results)
+            if checkpoint:
+                search.save(checkpoint)
+            best = search.history[-1]
+            print(f"generation {search.generation}: best {best['lines']:.1f} lines, "
+                  f"{best['pieces']:.1f} pieces, mean weights "
+                  + ", ".join(f"{w:.3f}" for w in search.mean))
+    return search
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tune the autoplayer weights by self-play")
+    parser.add_argument("--generations", type=int, default=20, help="total, including resumed ones")
+    parser.add_argument("--population", type=int, default=24)
+    parser.add_argument("--games", type=int, default=8, help="games per weight vector")
+    parser.add_argument("--max-pieces", type=int, default=2000)
+    parser.add_argument("--lookahead", action="store_true")
+    parser.add_argument("--workers", type=int, help="processes, all cores by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--checkpoint", default="selfplay.json")
+    args = parser.parse_args()
+
+    if os.path.exists(args.checkpoint):
+        search = Search.load(args.checkpoint)
+        print(f"resuming {args.checkpoint} at generation {search.generation}")
+    else:
+        search = Search(seed=args.seed)
+    run(search, args.generations, args.population, args.games, args.max_pieces, args.lookahead,
+        args.checkpoint, args.workers)
+    print("best:", search.best)
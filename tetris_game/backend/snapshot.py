@@ -0,0 +1,75 @@
+"""Compact binary snapshots of a whole `Engine`.
+
+A snapshot holds everything a game continues from: the board's row masks,
+the active piece, the piece generator's state, score, lines and ticks. A
+10x20 game fits in under 150 bytes and restoring it only unpacks a header
+and one integer per row, cheap enough for bots to roll back after trying a
+move.
+
+Layout (little-endian): header (see HEADER), the kinds left in the bag (one
+byte each, indexes into SHAPE_ORDER), then every row mask, bottom row
+first, in ceil(width / 8) bytes.
+"""
+import struct
+
+from engine import Engine, Piece, SHAPE_ORDER
+from randomizer import Randomizer
+
+MAGIC = b"TSNP"
+VERSION = 1
+# magic, version, flags (bit 0: 7-bag, bit 1: game over), width, height,
+# piece kind, rotation, col, row, seed, generator state, score, lines, pieces, ticks, bag size
+HEADER = struct.Struct("<4sBBHHBBhhQQIIIIB")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def snapshot(engine: Engine) -> bytes:
+    board, piece, shapes = engine.board, engine.piece, engine.shapes
+    flags = int(engine.bag) | int(engine.over) << 1
+    out = bytearray(HEADER.pack(MAGIC, VERSION, flags, board.width, board.height,
+                                SHAPE_ORDER.index(piece.kind), piece.rotation, piece.col, piece.row,
+                                engine.seed, shapes.state, engine.score, engine.lines,
+                                engine.pieces, engine.ticks, len(shapes.pending)))
+    out += bytes(SHAPE_ORDER.index(kind) for kind in shapes.pending)
+    size = (board.width + 7) // 8
+    for mask in board.rows:
+        out += mask.to_bytes(size, "little")
+    return bytes(out)
+
+
+def restore(data: bytes, engine: Engine = None) -> Engine:
+    """Puts the snapshot's game into `engine` (a new one if None, resized if needed)"""
+    if len(data) < HEADER.size:
+        raise SnapshotError("snapshot header is truncated")
+    (magic, version, flags, width, height, kind, rotation, col, row, seed, state,
+     score, lines, pieces, ticks, pending) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError(f"not a version {VERSION} tetris snapshot")
+    size = (width + 7) // 8
+    pos = HEADER.size + pending
+    if len(data) != pos + height * size:
+        raise SnapshotError("snapshot size doesn't match its board")
+    if kind >= len(SHAPE_ORDER) or rotation >= 4 or any(i >= len(SHAPE_ORDER) for i in data[HEADER.size:pos]):
+        raise SnapshotError("snapshot holds an unknown piece kind or rotation")
+
+    bag = bool(flags & 1)
+    if engine is None or (engine.board.width, engine.board.height) != (width, height):
+        engine = Engine(width, height, seed=seed, bag=bag)
+    shapes = Randomizer(SHAPE_ORDER, seed, bag)
+    shapes.state = state
+    shapes.pending = [SHAPE_ORDER[i] for i in data[HEADER.size:pos]]
+
+    board = engine.board
+    board.rows = [int.from_bytes(data[pos + i * size:pos + (i + 1) * size], "little") for i in range(height)]
+    board.update_heights()
+    board.rehash()
+    engine.bag, engine.shapes, engine.seed = bag, shapes, seed
+    engine.piece = Piece(SHAPE_ORDER[kind], col, row, rotation)
+    engine.score, engine.lines, engine.pieces, engine.ticks = score, lines, pieces, ticks
+    engine.cleared, engine.moved = [], []
+    engine.over = bool(flags & 2)
+    engine.ghost = None
+    return engine
@@ -1,75 +1,88 @@
 import turtle as tt
 from collections.abc import Sequence
 from random import randint
-from math import sin, cos, pi
+
+
+PALETTE = []        # color index -> turtle color
+COLOR_IDS = {}      # turtle color -> color index
+
+
+def color_id(color) -> int:
+    """Small integer standing for `color`, registered in PALETTE on first use"""
+    if color not in COLOR_IDS:
+        COLOR_IDS[color] = len(PALETTE)
+        PALETTE.append(color)
+    return COLOR_IDS[color]
 
 
 class Cell:
-    def __init__(self, size, color, pen, *points, state=0):
-        assert len(points) == 4, "Number of points must be 4"
-        assert points[0] != points[1] != points[2] != points[3], "There can't be duplicates in cell corners"
-        self.points = list(points)
-        self.color = color
-        self.pen = pen
-        self.size = size
-        self.state = state
-
-    def draw(self):
-        self.pen.pu()
-        self.pen.goto(self.points[0])
-        self.pen.fillcolor(self.color)
-        self.pen.pd()
-        self.pen.begin_fill()
-        for p in self.points + [self.points[0]]:
-            self.pen.goto(p)
-        self.pen.end_fill()
+    """One grid square: row (0 at the bottom), column and palette color index.
+    Pixel corners are only worked out when the cell is drawn."""
+
+    __slots__ = ("row", "col", "color_id")
+
+    def __init__(self, row, col, color_id=0):
+        self.row = row
+        self.col = col
+        self.color_id = color_id
+
+    @property
+    def color(self):
+        return PALETTE[self.color_id]
+
+    def points(self, size):
+        """Turtle corners, clockwise from the top-right one"""
+        x, y = self.col * size, (self.row + 1) * size
+        return [(x+size, y), (x+size, y-size), (x, y-size), (x, y)]
+
+    def draw(self, pen, size):
+        points = self.points(size)
+        pen.pu()
+        pen.goto(points[-1])
+        pen.fillcolor(self.color)
+        pen.pd()
+        pen.begin_fill()
+        for p in points:
+            pen.goto(p)
+        pen.end_fill()
 
     def rotate(self, xc, yc):
-        self.points = [( round(xc + (x-xc)*cos(-pi/2) - (y-yc)*sin(-pi/2)),
-                         round(yc + (x-xc)*sin(-pi/2) + (y-yc)*cos(-pi/2)) )
-                            for x, y in self.points]
+        # clockwise quarter turn of the cell center around (xc, yc), in grid units
+        self.col, self.row = round(xc + self.row - yc), round(yc + xc - self.col - 1)
 
     def translate_x(self, factor=1):
-        self.points = [(x+factor*self.size, y) for x, y in self.points]
+        self.col += factor
 
     def translate_y(self, factor=1):
-        self.points = [(x, y+factor*self.size) for x, y in self.points]
+        self.row += factor
 
-    def get_bounds(self):
-        xl, xh = sorted(set(x for x, y in self.points))
-        yl, yh = sorted(set(y for x, y in self.points))
-        return xl, yl, xh, yh
+    def get_bounds(self, size=1):
+        return self.col * size, self.row * size, (self.col + 1) * size, (self.row + 1) * size
 
     def __neg__(self):
-        points = [(x, y-self.size) for x, y in self.points]
-        s, c, p = self.size, self.color, self.pen
-        return Cell(s, c, p, *points)
+        return Cell(self.row - 1, self.col, self.color_id)
 
     def __rshift__(self, factor:int):
-        points = [(x+factor*self.size, y) for x, y in self.points]
-        s, c, p = self.size, self.color, self.pen
-        return Cell(s, c, p, *points)
+        return Cell(self.row, self.col + factor, self.color_id)
 
     def __lshift__(self, factor:int):
-        points = [(x-factor*self.size, y) for x, y in self.points]
-        s, c, p = self.size, self.color, self.pen
-        return Cell(s, c, p, *points)
+        return Cell(self.row, self.col - factor, self.color_id)
 
     def __mul__(self, point: Sequence[float, float]):
-        xc, yc = point
-        points = [(round(xc + (x-xc) * cos(-pi/2) - (y - yc) * sin(-pi/2)),
-                   round(yc + (x-xc) * sin(-pi/2) + (y - yc) * cos(-pi/2)))
-                  for x, y in self.points]
-        s, c, p = self.size, self.color, self.pen
-        return Cell(s, c, p, *points)
+        cell = Cell(self.row, self.col, self.color_id)
+        cell.rotate(*point)
+        return cell
 
     def __eq__(self, other):
         if not isinstance(other, Cell): return NotImplemented
-        return set(self.points) == set(other.points)
+        return self.row == other.row and self.col == other.col
 
     def __ne__(self, other):
         return not self == other
 
+    def __hash__(self):
+        return hash((self.row, self.col))
+
     def __str__(self):
         return f"{self.__class__.__name__}{self.get_bounds()}"
 
@@ -106,15 +119,23 @@ class Tetromino:
         self.pen.fillcolor(self.color)
         self.pen.pd()
         self.pen.begin_fill()
-        points = []
         for _ in range(4):
             self.pen.fd(self.size)
             self.pen.right(90)
-            x, y = [round(p) for p in self.pen.pos()]
-            points.append((x,y))
-        self.cells.append(Cell(self.size, color, self.pen, *points))
+        self.cells.append(Cell(round(y / self.size) - 1, round(x / self.size), color_id(self.color)))
         self.pen.end_fill()
 
+    def grid_cells(self, cells, color=""):
+        """Cells for the given (col, row) grid positions, not drawn yet"""
+        cid = color_id(color or self.color)
+        return [Cell(row, col, cid) for col, row in cells]
+
+    def place(self, cells, color=""):
+        """Redraws the tetro on the given (col, row) grid cells"""
+        self.color = color or self.color
+        self.cells = self.grid_cells(cells)
+        self.redraw()
+
     def draw_bounds(self):
         if self.rot_bounds:
             xl, yl, xh, yh = self.rot_bounds
@@ -130,7 +151,7 @@ class Tetromino:
         self.pen.clear()
         self.update_bounds()
         for cell in self.cells:
-            cell.draw()
+            cell.draw(self.pen, self.size)
         self.update_screen()
 
     def right(self, factor:int=1):
@@ -156,8 +177,9 @@ class Tetromino:
         self.up(-factor)
 
     def rotate(self):
+        xc, yc = self.rot_center
         for c in self.cells:
-            c.rotate(*self.rot_center)
+            c.rotate(xc / self.size, yc / self.size)
         self.redraw()
         self.change_state()
 
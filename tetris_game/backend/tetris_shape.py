@@ -1,7 +1,7 @@
 import turtle as tt
 from random import randint as r
 from itertools import cycle
-from tetro_base import Tetromino
+from tetris_Movement import Tetromino
 
 LJSZT_Offsets = ((0, 1, 0, 0),
                  (1, 0, 0, 0),
@@ -0,0 +1,318 @@
+"""Two-player versus games over a local TCP connection.
+
+Every frame each side sends one message holding only what changed since
+its previous message: the board rows whose mask differs, the active piece
+if it moved, score/lines if they changed and the garbage lines it attacks
+with. Nothing changed means nothing is sent. While the socket is still
+busy with the last message no new one is built; the next one then covers
+all the changes since, so a slow link never queues up a backlog.
+
+The first message each way is a hello, b"TVS1" and the board's width and
+height (u16 each); the link refuses a peer whose board differs. Every later
+message (little-endian), after a u16 length prefix: flags, tick (u32),
+changed row count (u16), then by flag the piece (kind, rotation, col,
+row), score and lines (u32 each), garbage (count, hole column), and
+finally each changed row as its index (u16) and ceil(width / 8) mask bytes.
+The first message of a game (and of each one after `reset()`) carries the
+NEW_GAME flag and every row, so the peer's mirror starts over.
+A message that doesn't fit the board closes the link with `error` set.
+
+    python versus.py --seconds 10     # two autoplayers on loopback at 60 Hz
+"""
+import argparse
+import random
+import socket
+import struct
+import time
+
+from engine import Engine, SHAPE_ORDER
+
+LENGTH = struct.Struct("<H")
+HELLO = struct.Struct("<4sHH")      # magic, width, height
+MAGIC = b"TVS1"
+HEAD = struct.Struct("<BIH")        # flags, tick, changed rows
+PIECE = struct.Struct("<BBhh")      # kind, rotation, col, row
+SCORE = struct.Struct("<II")        # score, lines
+GARBAGE = struct.Struct("<BB")      # lines, hole column
+ROW = struct.Struct("<H")           # row index, followed by the row mask
+
+PIECE_CHANGED, SCORE_CHANGED, GARBAGE_SENT, GAME_OVER, NEW_GAME = 1, 2, 4, 8, 16
+CONNECT_TIMEOUT = 10.0      # seconds host()/join() wait for the peer's hello
+
+
+class VersusError(ValueError):
+    pass
+
+
+class Opponent:
+    """The other player's game as the messages so far describe it"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.rows = [0] * height
+        self.piece = None           # (kind, rotation, col, row)
+        self.score = 0
+        self.lines = 0
+        self.over = False
+        self.tick = 0
+
+
+class VersusLink:
+    """One side of a versus game: sends the engine's changes, mirrors the opponent's.
+
+    Call `sync()` once per frame. Garbage the opponent sends is queued on the
+    engine (`Engine.incoming`) and rises at its next lock. `on_opponent`, if
+    set, is called with the opponent and the rows that changed whenever a
+    message arrives. Nothing but the hello is sent before the peer's hello
+    arrived (`ready`). A bad hello or message closes the link and leaves the
+    reason in `error`, the game goes on without the opponent.
+    """
+
+    def __init__(self, engine: Engine, sock: socket.socket, seed=None):
+        self.engine = engine
+        self.sock = sock
+        sock.setblocking(False)
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        width, height = engine.board.width, engine.board.height
+        self.row_size = (width + 7) // 8
+        self.opponent = Opponent(width, height)
+        self.on_opponent = None
+        self.rng = random.Random(seed)
+        self.tick = 0
+        self.inbox = bytearray()
+        self.outbox = bytearray()
+        self.closed = False
+        self.ready = False
+        self.error = None
+        self.bytes_sent = self.bytes_received = self.messages_sent = 0
+        self.reset()
+        self.outbox += LENGTH.pack(HELLO.size) + HELLO.pack(MAGIC, width, height)
+        self.flush()
+
+    def reset(self):
+        """Forgets what was sent, the next message describes the whole game again as a new game"""
+        self.sent_rows = [-1] * self.engine.board.height      # no mask is -1: every row goes out
+        self.new_game = True
+        self.sent_piece = None
+        self.sent_score = (0, 0)
+        self.sent_garbage = 0
+        self.sent_over = False
+
+    @classmethod
+    def host(cls, engine, port, address="", seed=None) -> "VersusLink":
+        """Waits for the opponent to connect on `port`; raises VersusError if its board differs"""
+        with socket.create_server((address, port)) as server:
+            sock, _ = server.accept()
+        return cls(engine, sock, seed).wait_ready()
+
+    @classmethod
+    def join(cls, engine, address, port, seed=None) -> "VersusLink":
+        """Connects to the host; raises VersusError if its board differs"""
+        return cls(engine, socket.create_connection((address, port)), seed).wait_ready()
+
+    def wait_ready(self, timeout=CONNECT_TIMEOUT) -> "VersusLink":
+        """Blocks until the peer's hello arrived, raising VersusError if it was refused"""
+        deadline = time.monotonic() + timeout
+        while not self.ready and not self.closed and time.monotonic() < deadline:
+            self.flush()
+            self.receive()
+            time.sleep(0.01)
+        if not self.ready:
+            error = self.error or ("the opponent hung up" if self.closed else "the opponent never said hello")
+            self.close()
+            raise VersusError(error)
+        return self
+
+    def fail(self, error):
+        """Closes the link because of a bad peer"""
+        self.error = error
+        print(f"versus link closed: {error}")
+        self.close()
+
+    def sync(self):
+        """Reads what the opponent sent, then sends this frame's changes"""
+        self.tick += 1
+        self.receive()
+        if not self.outbox and self.ready and not self.closed:
+            message = self.encode()
+            if message:
+                self.outbox += LENGTH.pack(len(message)) + message
+                self.messages_sent += 1
+        self.flush()
+
+    def encode(self):
+        """The changes since the last message, None if there are none"""
+        engine = self.engine
+        flags, parts = 0, []
+
+        if self.new_game:
+            flags |= NEW_GAME
+            self.new_game = False
+        piece = engine.piece
+        state = SHAPE_ORDER.index(piece.kind), piece.rotation, piece.col, piece.row
+        if state != self.sent_piece:
+            flags |= PIECE_CHANGED
+            parts.append(PIECE.pack(*state))
+            self.sent_piece = state
+        if (engine.score, engine.lines) != self.sent_score:
+            flags |= SCORE_CHANGED
+            self.sent_score = engine.score, engine.lines
+            parts.append(SCORE.pack(*self.sent_score))
+        if engine.sent > self.sent_garbage:
+            flags |= GARBAGE_SENT
+            lines = min(engine.sent - self.sent_garbage, 255)
+            parts.append(GARBAGE.pack(lines, self.rng.randrange(engine.board.width)))
+            self.sent_garbage += lines
+        if engine.over and not self.sent_over:
+            flags |= GAME_OVER
+            self.sent_over = True
+
+        rows, sent = engine.board.rows, self.sent_rows
+        changed = [row for row in range(len(rows)) if rows[row] != sent[row]]
+        for row in changed:
+            sent[row] = rows[row]
+            parts.append(ROW.pack(row) + rows[row].to_bytes(self.row_size, "little"))
+
+        if not flags and not changed:
+            return None
+        return HEAD.pack(flags, self.tick, len(changed)) + b"".join(parts)
+
+    def hello(self, message):
+        """Checks the peer's hello: same protocol, same board size"""
+        if len(message) != HELLO.size:
+            return self.fail("the peer doesn't speak this versus protocol")
+        magic, width, height = HELLO.unpack(message)
+        if magic != MAGIC:
+            return self.fail("the peer doesn't speak this versus protocol")
+        if (width, height) != (self.opponent.width, self.opponent.height):
+            return self.fail(f"the opponent plays on {width}x{height}, "
+                             f"this board is {self.opponent.width}x{self.opponent.height}")
+        self.ready = True
+
+    def decode(self, message):
+        """Applies one message to the opponent mirror (and its garbage to the engine).
+
+        Raises VersusError for a message that doesn't fit the board.
+        """
+        opponent = self.opponent
+        flags, tick, count = HEAD.unpack_from(message)
+        pos = HEAD.size
+        opponent.tick = tick
+        if flags & NEW_GAME:            # rows and piece follow in this message
+            opponent.piece = None
+            opponent.score = opponent.lines = 0
+            opponent.over = False
+        if flags & PIECE_CHANGED:
+            kind, rotation, col, row = PIECE.unpack_from(message, pos)
+            if kind >= len(SHAPE_ORDER) or rotation > 3:
+                raise VersusError(f"unknown piece {kind}/{rotation}")
+            opponent.piece = SHAPE_ORDER[kind], rotation, col, row
+            pos += PIECE.size
+        if flags & SCORE_CHANGED:
+            opponent.score, opponent.lines = SCORE.unpack_from(message, pos)
+            pos += SCORE.size
+        if flags & GARBAGE_SENT:
+            lines, hole = GARBAGE.unpack_from(message, pos)
+            if hole >= opponent.width:      # a full garbage row could never be cleared
+                raise VersusError(f"garbage hole {hole} is off the board")
+            self.engine.incoming.append((lines, hole))
+            pos += GARBAGE.size
+        if flags & GAME_OVER:
+            opponent.over = True
+        changed = []
+        for _ in range(count):
+            (row, ) = ROW.unpack_from(message, pos)
+            pos += ROW.size
+            if row >= opponent.height or pos + self.row_size > len(message):
+                raise VersusError(f"row {row} is off the board or cut short")
+            opponent.rows[row] = int.from_bytes(message[pos:pos + self.row_size], "little")
+            pos += self.row_size
+            changed.append(row)
+        if self.on_opponent:
+            self.on_opponent(opponent, changed)
+
+    def receive(self):
+        while not self.closed:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b""
+            if not data:
+                self.closed = True
+                break
+            self.bytes_received += len(data)
+            self.inbox += data
+        inbox = self.inbox
+        while len(inbox) >= LENGTH.size and self.error is None:
+            (size, ) = LENGTH.unpack_from(inbox)
+            if len(inbox) < LENGTH.size + size:
+                break
+            message = bytes(inbox[LENGTH.size:LENGTH.size + size])
+            del inbox[:LENGTH.size + size]
+            if not self.ready:
+                self.hello(message)
+                continue
+            try:
+                self.decode(message)
+            except (VersusError, struct.error) as error:
+                self.fail(f"bad message from the opponent: {error}")
+
+    def flush(self):
+        if not self.outbox or self.closed:
+            return
+        try:
+            sent = self.sock.send(self.outbox)
+        except BlockingIOError:
+            return
+        except OSError:
+            self.closed = True
+            return
+        self.bytes_sent += sent
+        del self.outbox[:sent]
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+
+
+def headless_match(seconds=10.0, hz=60, seed=0, port=0):
+    """Two autoplayers, one engine and link each, over loopback TCP; returns both links"""
+    from autoplayer import AutoPlayer
+
+    with socket.create_server(("127.0.0.1", port)) as server:
+        client = socket.create_connection(server.getsockname())
+        conn, _ = server.accept()
+    links = [VersusLink(Engine(seed=seed + i), sock, seed + i) for i, sock in enumerate((conn, client))]
+    players = [AutoPlayer() for _ in links]
+    gravity = hz // 4           # a gravity step every quarter second, the bot drops a piece per step
+    frame, start = 0, time.monotonic()
+    while time.monotonic() - start < seconds and not any(link.engine.over for link in links):
+        frame += 1
+        for link, player in zip(links, players):
+            if frame % gravity == 0:
+                player.play_piece(link.engine)
+            link.sync()
+        time.sleep(max(0.0, start + frame / hz - time.monotonic()))
+    for _ in range(3):              # let the last changes arrive
+        for link in links:
+            link.sync()
+        time.sleep(0.01)
+    return links, frame
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless versus match between two autoplayers")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--hz", type=int, default=60)
+    args = parser.parse_args()
+
+    links, frames = headless_match(args.seconds, args.hz)
+    for i, link in enumerate(links):
+        engine, mirror = link.engine, links[1 - i].opponent
+        print(f"player {i + 1}: {engine.pieces} pieces, {engine.lines} lines, garbage sent {engine.sent}"
+              f"{', lost' if engine.over else ''}; mirrored {'exactly' if mirror.rows == engine.board.rows else 'WRONG'}; "
+              f"{link.messages_sent} messages, {link.bytes_sent / frames * args.hz:.0f} bytes/s")
@@ -0,0 +1,205 @@
+"""Offscreen rendering of replays to an animated GIF or a PNG sequence.
+
+The replay drives an `Engine` headless, and after every gravity tick the
+board is drawn into one reusable NumPy buffer of palette indices. Drawing
+copies pre-built per-color cell tiles into the buffer, and only for the
+cells whose color changed since the previous frame. No turtle or Tk is
+involved. The frames are palette images from the start, so writing them
+needs no color quantization, and each one is written out as soon as it is
+drawn: a game of thousands of ticks exports in seconds, in the memory of a
+single frame.
+
+    python video.py game.replay game.gif --cell 16 --speed 2
+    python video.py game.replay frames/         # frames/00000.png ... and frames/frames.txt
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from PIL import GifImagePlugin, Image, ImageColor
+
+from engine import COLORS, LANDED_COLOR, SHAPE_ORDER
+from game_loop import gravity_ms
+from replay import Replay, ReplayError
+
+EMPTY_COLOR = "#FAEDCB"         # as on the canvas
+OUTLINE_COLOR = "black"
+# palette index -> color: empty cells, the kinds in SHAPE_ORDER, cells of unknown kind, outlines
+PALETTE = (EMPTY_COLOR, *(COLORS[kind] for kind in SHAPE_ORDER), LANDED_COLOR, OUTLINE_COLOR)
+EMPTY, LANDED, OUTLINE = 0, len(SHAPE_ORDER) + 1, len(SHAPE_ORDER) + 2
+KIND_INDEX = {kind: i + 1 for i, kind in enumerate(SHAPE_ORDER)}
+GAME_OVER_MS = 2000             # how long the last frame stays up
+
+
+def build_tiles(cell) -> np.ndarray:
+    """(colors, cell, cell) palette-index tiles: each cell color inside a one-pixel outline"""
+    tiles = np.empty((OUTLINE, cell, cell), dtype=np.uint8)
+    tiles[:] = np.arange(OUTLINE, dtype=np.uint8)[:, None, None]
+    tiles[:, [0, -1], :] = OUTLINE
+    tiles[:, :, [0, -1]] = OUTLINE
+    return tiles
+
+
+class FrameRenderer:
+    """Draws an engine into a (height * cell, width * cell) uint8 buffer of `PALETTE` indices.
+
+    `colors` tracks the color of every landed cell the way `CanvasRenderer`
+    does: `landed()` adds a locked piece and then applies the engine's line
+    clear and garbage. `render()` puts the active piece on top of it and
+    blits the tiles of the cells that changed since the last frame; `dirty`
+    is then the pixel box (left, top, right, bottom) around them, None when
+    nothing changed.
+    """
+
+    def __init__(self, width=10, height=20, cell=16):
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.tiles = build_tiles(cell)
+        self.buffer = np.zeros((height * cell, width * cell), dtype=np.uint8)
+        # (screen row, col, y, x) view of the buffer, screen row 0 being the top
+        self.cells = self.buffer.reshape(height, cell, width, cell).transpose(0, 2, 1, 3)
+        self.palette = [value for color in PALETTE for value in ImageColor.getrgb(color)]
+        self.dirty = None
+        self.reset()
+
+    def reset(self, engine=None):
+        """Starts from the engine's board (empty without one), landed cells drawn in LANDED_COLOR"""
+        self.colors = np.zeros((self.height, self.width), dtype=np.uint8)
+        if engine is not None:
+            self.colors[self.masks(engine.board.rows)] = LANDED
+        self.shown = np.full((self.height, self.width), -1, dtype=np.int16)
+
+    def masks(self, rows):
+        """(len(rows), width) bool array of row masks"""
+        return np.array([[mask >> col & 1 for col in range(self.width)] for mask in rows], dtype=bool)
+
+    def landed(self, engine, piece):
+        """Copies a locked piece into `colors` and replays the engine's line clear and garbage"""
+        for col, row in piece.cells():
+            if row < self.height:
+                self.colors[row, col] = KIND_INDEX[piece.kind]
+        if engine.cleared:          # clear_lines keeps the other rows in order
+            kept = np.delete(self.colors, engine.cleared, axis=0)
+            self.colors = np.vstack([kept, np.zeros((len(engine.cleared), self.width), dtype=np.uint8)])
+        if engine.raised:
+            garbage = np.where(self.masks(engine.board.rows[:engine.raised]), LANDED, EMPTY).astype(np.uint8)
+            self.colors = np.vstack([garbage, self.colors[:self.height - engine.raised]])
+
+    def render(self, engine) -> np.ndarray:
+        """The buffer showing the engine now; the same array every call"""
+        wanted = self.colors[::-1].copy()       # screen rows, top first
+        piece = engine.piece
+        for col, row in piece.cells():
+            if row < self.height:
+                wanted[self.height - 1 - row, col] = KIND_INDEX[piece.kind]
+        rows, cols = np.nonzero(wanted != self.shown)
+        self.dirty = None
+        if len(rows):
+            self.cells[rows, cols] = self.tiles[wanted[rows, cols]]
+            self.shown[rows, cols] = wanted[rows, cols]
+            c = self.cell
+            self.dirty = cols.min() * c, rows.min() * c, (cols.max() + 1) * c, (rows.max() + 1) * c
+        return self.buffer
+
+    def image(self, box=None) -> Image.Image:
+        """A palette image copy of the buffer, or of the pixel box (left, top, right, bottom) in it"""
+        left, top, right, bottom = box or (0, 0, self.buffer.shape[1], self.buffer.shape[0])
+        pixels = np.ascontiguousarray(self.buffer[top:bottom, left:right])
+        image = Image.frombytes("P", (right - left, bottom - top), pixels.tobytes())
+        image.putpalette(self.palette)
+        return image
+
+
+def frames(replay: Replay, renderer: FrameRenderer, speed=1.0):
+    """Plays the replay headless, yielding (engine, milliseconds on screen) after every tick.
+
+    Inputs are applied in the tick they were recorded in, like `Replay.play`,
+    and a tick stays up for the gravity period of the level it was played at.
+    The renderer's buffer holds the frame when each pair is yielded.
+    """
+    engine = replay.new_engine()
+    renderer.reset(engine)
+    inputs, i = replay.inputs, 0
+
+    def run(move):
+        piece, pieces = engine.piece, engine.pieces
+        move()
+        if engine.pieces != pieces:
+            renderer.landed(engine, piece)
+
+    while True:
+        while i < len(inputs) and inputs[i][0] <= engine.ticks and not engine.over:
+            run(getattr(engine, inputs[i][1]))
+            i += 1
+        renderer.render(engine)
+        if engine.over or (i == len(inputs) and engine.ticks >= replay.end_tick):
+            break
+        yield engine, gravity_ms(engine.level) / speed
+        run(engine.step)
+    yield engine, GAME_OVER_MS
+
+
+def write_gif_frame(f, image, offset, ms):
+    f.write(b"".join(GifImagePlugin.getdata(image, offset, duration=max(int(ms), 20))))  # browsers slow down faster frames
+
+
+def export_gif(replay, path, cell=16, speed=1.0) -> int:
+    """Writes the replay as an animated GIF, frame by frame; returns the number of frames.
+
+    Pillow's save(append_images=...) holds every frame until the end, so the
+    file is written here with its GIF helpers instead. A frame goes out once
+    the next one shows whether anything changed: only the box of changed
+    cells is encoded (the rest stays from the frame before), and an
+    unchanged tick just adds its time to the frame on screen.
+    """
+    renderer = FrameRenderer(replay.width, replay.height, cell)
+    pending, count = None, 0
+    with open(path, "wb") as f:
+        for count, (_, ms) in enumerate(frames(replay, renderer, speed), 1):
+            if pending is None:
+                header, _ = GifImagePlugin.getheader(renderer.image(), info={"loop": 0})
+                f.write(b"".join(header))
+                pending = [renderer.image(), (0, 0), 0]
+            elif renderer.dirty:
+                write_gif_frame(f, *pending)
+                pending = [renderer.image(renderer.dirty), renderer.dirty[:2], 0]
+            pending[2] += ms
+        write_gif_frame(f, *pending)
+        f.write(b";")       # trailer
+    return count
+
+
+def export_png(replay, directory, cell=16, speed=1.0) -> int:
+    """Writes one PNG per frame into `directory`, plus frames.txt listing each frame's
+    duration for ffmpeg's concat demuxer; returns the number of frames"""
+    os.makedirs(directory, exist_ok=True)
+    renderer = FrameRenderer(replay.width, replay.height, cell)
+    lines, count = [], 0
+    for count, (_, ms) in enumerate(frames(replay, renderer, speed), 1):
+        name = f"{count - 1:05d}.png"
+        renderer.image().save(os.path.join(directory, name), compress_level=1)
+        lines += [f"file '{name}'", f"duration {ms / 1000:.3f}"]
+    lines.append(f"file '{count - 1:05d}.png'")     # concat drops the last duration without it
+    with open(os.path.join(directory, "frames.txt"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render a replay to a GIF or a directory of PNGs")
+    parser.add_argument("replay")
+    parser.add_argument("output", help="a .gif file, anything else is a directory for PNGs")
+    parser.add_argument("--cell", type=int, default=16, help="cell size in pixels")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed factor")
+    args = parser.parse_args()
+
+    try:
+        replay = Replay.load(args.replay)
+    except ReplayError as error:
+        parser.exit(1, f"{args.replay}: {error}\n")
+    export = export_gif if args.output.lower().endswith(".gif") else export_png
+    start = time.perf_counter()
+    count = export(replay, args.output, args.cell, args.speed)
+    print(f"{count} frames in {time.perf_counter() - start:.2f} s -> {args.output}")
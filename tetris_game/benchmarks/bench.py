@@ -0,0 +1,267 @@
+"""Micro-benchmarks for the tetris hot paths.
+
+    python benchmarks/bench.py                         # writes bench_results.json
+    python benchmarks/bench.py --baseline baseline.json
+    python benchmarks/bench.py --out baseline.json     # store a new baseline
+
+Board operations are timed on synthetic boards at several fill levels, on
+10x20 and on a BIG_BOARD, and
+full scripted games are timed headless and through an offscreen (withdrawn)
+Tk root with both the canvas and the turtle view. The turtle/Tk cases need a
+display and are listed under "skipped" without one. With --baseline, every
+case slower than the baseline by more than --tolerance is reported and the
+exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+from itertools import cycle
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "backend"), os.path.join(HERE, "..", "frontend")]
+
+from engine import Engine, Board, SHAPE_ORDER
+from tetris_Movement import Cell
+
+FILL_LEVELS = (0.0, 0.25, 0.5, 0.75)
+GAME_PIECES = 500
+BIG_BOARD = (100, 200)      # width, height
+
+
+def synthetic_board(fill, width=10, height=20, seed=0):
+    """Board whose bottom `fill` share of rows is ~70% occupied, never a full row"""
+    rng = random.Random(seed)
+    board = Board(width, height)
+    for row in range(int(height * fill)):
+        mask = sum(1 << col for col in range(width) if rng.random() < 0.7)
+        board.rows[row] = mask & ~(1 << rng.randrange(width))
+    board.update_heights()
+    return board
+
+
+def with_full_rows(board, count=4, seed=0):
+    """Copy of `board` with `count` of its stack rows made full"""
+    rng = random.Random(seed)
+    copy = Board(board.width, board.height)
+    copy.rows = list(board.rows)
+    top = max(max(board.heights), count)
+    for row in rng.sample(range(top), count):
+        copy.rows[row] = copy.full_row
+    copy.update_heights()
+    return copy
+
+
+def engine_on(board, seed=0):
+    engine = Engine(board.width, board.height, seed=seed)
+    engine.board.rows = list(board.rows)
+    engine.board.update_heights()
+    return engine
+
+
+def bench(fn, number=2000, repeat=5):
+    """Best of `repeat` runs, in microseconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def bench_each(fn, setup, number=300, repeat=5):
+    """Like `bench` for calls that consume their input: `setup()` runs untimed before each call"""
+    best = float("inf")
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(number):
+            arg = setup()
+            start = time.perf_counter()
+            fn(arg)
+            total += time.perf_counter() - start
+        best = min(best, total)
+    return best / number * 1e6
+
+
+def script(seed=0, width=10):
+    """Endless per-piece inputs: a few turns, a shift across up to half the board, then a hard drop"""
+    rng = random.Random(seed)
+    while True:
+        moves = ["rotate"] * rng.randrange(4)
+        shift = rng.randint(-(width // 2), width // 2)
+        moves += ["left" if shift < 0 else "right"] * abs(shift)
+        yield moves
+
+
+def play_scripted(move, hard_drop, engine, reset, pieces=GAME_PIECES, after_piece=None, seed=0):
+    """Plays `pieces` pieces through the given callables, restarting with `reset(seed)` on game over"""
+    inputs = script(seed, engine.board.width)
+    for _ in range(pieces):
+        if engine.over:
+            reset(seed)
+        for instr in next(inputs):
+            move(instr)
+        hard_drop()
+        if after_piece:
+            after_piece()
+
+
+def board_cases(results, width=10, height=20):
+    """Board and engine operations at every fill level; names carry the size unless it is 10x20"""
+    size = "" if (width, height) == (10, 20) else f"{width}x{height}, "
+    rng = random.Random(1)
+    for fill in FILL_LEVELS:
+        board = synthetic_board(fill, width, height)
+        probes = [(rng.choice(SHAPE_ORDER), rng.randrange(4), rng.randint(-1, width - 2), rng.randint(0, height + 1))
+                  for _ in range(256)]
+        it = cycle(probes)
+        results[f"board.fits_piece[{size}{fill}]"] = bench(lambda: board.fits_piece(*next(it)))
+        cells = cycle([[(c + dc, r) for dc in range(4)] for _, _, c, r in probes])
+        results[f"board.fits[{size}{fill}]"] = bench(lambda: board.fits(next(cells)))
+
+        results[f"board.clear_lines[{size}{fill}]"] = bench_each(
+            lambda b: b.clear_lines(), lambda: with_full_rows(board))
+        results[f"engine.hard_drop[{size}{fill}]"] = bench_each(
+            lambda e: e.hard_drop(), lambda: engine_on(board))
+        results[f"engine.ghost_row[{size}{fill}]"] = bench_each(
+            lambda e: e.ghost_row, lambda: engine_on(board))
+
+
+def headless_cases():
+    results = {}
+    board_cases(results)
+    # filled big boards: the per-op costs next to the 10x20 ones show what grows with the board
+    board_cases(results, *BIG_BOARD)
+
+    cell = Cell(20, 4, 0)
+    results["cell.__mul__"] = bench(lambda: cell * (4.5, 20.5))
+
+    engine = Engine(seed=0)
+    start = time.perf_counter()
+    play_scripted(lambda instr: getattr(engine, instr)(), engine.hard_drop, engine, engine.reset)
+    results["game.headless[per piece]"] = (time.perf_counter() - start) / GAME_PIECES * 1e6
+
+    # the shifts span the whole width, so a piece takes ~5x the inputs of a 10x20 one; random
+    # drops never fill a 100-wide row, line clears on big boards are timed by board_cases above
+    engine = Engine(BIG_BOARD[0], BIG_BOARD[1], seed=0)
+    start = time.perf_counter()
+    play_scripted(lambda instr: getattr(engine, instr)(), engine.hard_drop, engine, engine.reset)
+    results["game.headless[100x200, per piece]"] = (time.perf_counter() - start) / GAME_PIECES * 1e6
+    return results
+
+
+def offscreen_tk():
+    """Withdrawn Tk root with a turtle screen on its canvas, or None without a display"""
+    import tkinter as tk
+    import turtle
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    root.withdraw()
+    canvas = tk.Canvas(root, width=600, height=600)
+    screen = turtle.TurtleScreen(canvas)
+    screen.tracer(0)
+    return root, canvas, screen
+
+
+def tk_cases(root, canvas, screen):
+    from gameplay import World
+    from canvas_renderer import CanvasRenderer
+
+    results = {}
+    size = 30
+    world = World(size=size, screen=screen, seed=0)
+    stack = world.view.stack
+
+    for fill in FILL_LEVELS:
+        board = synthetic_board(fill)
+        tetro = world.view.tetro
+        cells = [Cell(row, col, 0) for col, row in world.engine.piece.cells()]
+
+        def load(source):
+            world.stop(seed=0)
+            stack.board.rows[:] = source.rows
+            stack.board.update_heights()
+            for row, mask in enumerate(source.rows):
+                stack.absorb(*(Cell(row, col, 0) for col in range(source.width) if mask >> col & 1))
+            return world
+
+        load(board)
+        results[f"stack.ok_move[{fill}]"] = bench(lambda: stack.ok_move(cells, tetro))
+
+        def rearrange(source):
+            world = load(source)
+            cleared, moved = world.engine.board.clear_lines()
+            return cleared, moved
+
+        results[f"stack.rearrange[{fill}]"] = bench_each(
+            lambda args: stack.rearrange(*args), lambda: rearrange(with_full_rows(board)), number=30, repeat=3)
+        results[f"world.hard_drop[{fill}]"] = bench_each(
+            lambda w: w.hard_drop(), lambda: load(board), number=30, repeat=3)
+
+    world.stop(seed=0)
+    results["tetromino.redraw"] = bench(world.view.tetro.redraw, number=200, repeat=3)
+
+    for name, view in (("turtle", None), ("canvas", CanvasRenderer(canvas, size, (-5 * size, -10 * size)))):
+        game = World(size=size, screen=screen, view=view, seed=0)
+        start = time.perf_counter()
+        # World.stop also resets the view, so every game after a top-out starts clean on screen
+        play_scripted(game.move, game.hard_drop, game.engine, game.stop, after_piece=root.update_idletasks)
+        results[f"game.{name}[per piece]"] = (time.perf_counter() - start) / GAME_PIECES * 1e6
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Names of the cases more than `tolerance` slower than the baseline"""
+    slower = []
+    for name, us in results.items():
+        base = baseline.get(name)
+        if base and us > base * (1 + tolerance):
+            slower.append(name)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    results = headless_cases()
+    skipped = []
+    tk = offscreen_tk()
+    if tk:
+        results.update(tk_cases(*tk))
+        tk[0].destroy()
+    else:
+        skipped.append("turtle/Tk cases: no display")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "unit": "us per op",
+        "results": {name: round(us, 3) for name, us in results.items()},
+        "skipped": skipped,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, us in results.items():
+        print(f"{name:36} {us:12.3f} us")
+    for reason in skipped:
+        print(f"skipped: {reason}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        slower = compare(results, baseline, args.tolerance)
+        for name in slower:
+            print(f"SLOWER  {name}: {baseline[name]:.3f} -> {results[name]:.3f} us")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
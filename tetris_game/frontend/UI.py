@@ -1,16 +1,33 @@
+import argparse
+import os
+import sys
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, filedialog
 import turtle
-from tetris.sys230.Turtle2 import World  # Assuming your World class is in main.py
+
+# the game modules live next door in backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from gameplay import World
+from canvas_renderer import CanvasRenderer, MirrorRenderer
+from autoplayer import AutoPlayer
+from profiler import FrameProfiler
+from versus import VersusLink, VersusError
+
+# key symbol -> World action
+KEYMAP = {"Left": "left", "Right": "right", "Down": "down", "Up": "rotate", "space": "hard_drop"}
 
 
 class TetrisApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, width=10, height=20):
         super().__init__()
+        self.board_width = width
+        self.board_height = height
         self.title("TETRIS-CX")
         self.geometry("900x700")
         self.resizable(False, False)
 
+        self.profile_timer = None       # `after` id of the pending overlay refresh
         self.create_widgets()
         self.setup_turtle_canvas()
 
@@ -19,20 +36,34 @@ class TetrisApp(tk.Tk):
         control_frame.pack(side=tk.LEFT, fill=tk.Y)
 
         tk.Label(control_frame, text="TETRIS-CX", font=("Arial", 14, "bold")).pack(pady=10)
-        self.level_label = tk.Label(control_frame, text="level++ >> 1", font=("Arial", 10))
+        self.level_label = tk.Label(control_frame, text="Level 1", font=("Arial", 10))
         self.level_label.pack(pady=5)
 
         tk.Button(control_frame, text="▶ Play", command=self.play).pack(pady=5)
         tk.Button(control_frame, text="⏸ Pause", command=self.pause).pack(pady=5)
         tk.Button(control_frame, text="⏹ Stop", command=self.stop).pack(pady=5)
+        self.bot_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_frame, text="🤖 Autoplay", variable=self.bot_var,
+                       command=self.toggle_bot).pack(pady=5)
 
         status_frame = tk.Frame(self, width=180, bg="#e0f7fa")
         status_frame.pack(side=tk.RIGHT, fill=tk.Y)
+        self.status_frame = status_frame
         self.score_label = tk.Label(status_frame, text="Score: 0", font=("Arial", 12))
         self.score_label.pack(pady=10)
         self.lines_label = tk.Label(status_frame, text="Lines: 0", font=("Arial", 12))
         self.lines_label.pack(pady=5)
 
+        self.profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(status_frame, text="📊 Frame times", variable=self.profile_var,
+                       command=self.toggle_profiler).pack(pady=(20, 5))
+        self.profile_label = tk.Label(status_frame, text="", font=("Courier", 9), justify=tk.LEFT,
+                                      bg="#e0f7fa")
+        self.profile_label.pack(pady=5)
+        self.export_button = tk.Button(status_frame, text="Export CSV", command=self.export_profile,
+                                       state=tk.DISABLED)
+        self.export_button.pack(pady=5)
+
     def setup_turtle_canvas(self):
         canvas_frame = tk.Frame(self, bg="white")
         canvas_frame.pack(expand=True, fill=tk.BOTH)
@@ -40,15 +71,19 @@ class TetrisApp(tk.Tk):
         self.canvas.pack()
         self.screen = turtle.TurtleScreen(self.canvas)
         self.screen.tracer(0)
-        self.world = World(size=30, screen=self.screen)
+        self.screen.bgcolor("#C6DEF1")
 
-        # Optional: key controls similar to your code
-        self.screen.onkey(lambda: self.world.move("left"), "Left")
-        self.screen.onkey(lambda: self.world.move("right"), "Right")
-        self.screen.onkey(lambda: self.world.move("down"), "Down")
-        self.screen.onkey(lambda: self.world.move("rotate"), "Up")
-        self.screen.onkey(lambda: self.world.hard_drop(), "space")
-        self.screen.listen()
+        # TurtleScreen centers the canvas on (0, 0); the board gets the largest cells that fit
+        width, height = self.board_width, self.board_height
+        size = max(1, min(600 // width, 600 // height))
+        self.renderer = CanvasRenderer(self.canvas, size=size, origin=(-width * size / 2, -height * size / 2))
+        self.world = World(size=size, screen=self.screen, view=self.renderer, width=width, height=height)
+        self.world.on_score = self.update_status
+
+        # keys only feed the world's input buffer, the game loop applies them once per frame
+        self.canvas.bind("<KeyPress>", self.key_pressed)
+        self.canvas.bind("<KeyRelease>", self.key_released)
+        self.canvas.focus_set()
 
     def play(self):
         self.world.play()
@@ -58,8 +93,93 @@ class TetrisApp(tk.Tk):
 
     def stop(self):
         self.world.stop()
-        # Reset UI indicators if you track score/lines here
+
+    def key_pressed(self, event):
+        if event.keysym in KEYMAP:
+            self.world.inputs.press(KEYMAP[event.keysym])
+
+    def key_released(self, event):
+        if event.keysym in KEYMAP:
+            self.world.inputs.release(KEYMAP[event.keysym])
+
+    def toggle_bot(self):
+        bot = AutoPlayer(self.world.engine.board.width, lookahead=True) if self.bot_var.get() else None
+        self.world.autoplay(bot)
+
+    def toggle_profiler(self):
+        on = self.profile_var.get()
+        self.world.profile(FrameProfiler() if on else None)
+        self.export_button.config(state=tk.NORMAL if on else tk.DISABLED)
+        self.profile_label.config(text="")
+        if self.profile_timer:      # a quick off/on must not leave a second refresh chain running
+            self.after_cancel(self.profile_timer)
+            self.profile_timer = None
+        if on:
+            self.refresh_profile()
+
+    def refresh_profile(self):
+        """Redraws the overlay twice a second while profiling is on"""
+        self.profile_timer = None
+        profiler = self.world.profiler
+        if not profiler:
+            return
+        stats = profiler.summary()
+        self.profile_label.config(text=f"frame p50 {stats['p50_ms']:6.2f} ms\n"
+                                       f"frame p99 {stats['p99_ms']:6.2f} ms\n"
+                                       f"dropped {stats['dropped']}/{stats['frames']}")
+        self.profile_timer = self.after(500, self.refresh_profile)
+
+    def export_profile(self):
+        if not self.world.profiler:
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
+        if path:
+            self.world.profiler.export_csv(path)
+
+    def start_versus(self, port, address=None):
+        """Hosts a versus game on `port`, or joins the one at `address`; blocks until connected.
+        Raises VersusError when the opponent's board size differs."""
+        engine = self.world.engine
+        link = VersusLink.join(engine, address, port) if address else VersusLink.host(engine, port)
+        link.on_opponent = self.update_opponent
+        self.world.connect(link)
+
+        width, height = engine.board.width, engine.board.height
+        size = max(1, min(160 // width, 320 // height))
+        tk.Label(self.status_frame, text="Opponent", font=("Arial", 12, "bold")).pack(pady=(20, 5))
+        canvas = tk.Canvas(self.status_frame, width=width * size, height=height * size,
+                           bg="#C6DEF1", highlightthickness=0)
+        canvas.pack()
+        self.mirror = MirrorRenderer(canvas, width, height, size)
+        self.opponent_label = tk.Label(self.status_frame, text="Score: 0  Lines: 0", font=("Arial", 10))
+        self.opponent_label.pack(pady=5)
+
+    def update_opponent(self, opponent, rows):
+        self.mirror.update(opponent, rows)
+        self.opponent_label.config(text=f"Score: {opponent.score}  Lines: {opponent.lines}"
+                                        + ("  KO!" if opponent.over else ""))
+
+    def update_status(self, engine):
+        self.level_label.config(text=f"Level {engine.level}")
+        self.score_label.config(text=f"Score: {engine.score}")
+        self.lines_label.config(text=f"Lines: {engine.lines}")
 
 if __name__ == "__main__":
-    app = TetrisApp()
+    parser = argparse.ArgumentParser(description="TETRIS-CX")
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--height", type=int, default=20)
+    parser.add_argument("--host", type=int, metavar="PORT", help="host a versus game on PORT")
+    parser.add_argument("--join", metavar="ADDRESS:PORT", help="join the versus game at ADDRESS:PORT")
+    args = parser.parse_args()
+    app = TetrisApp(args.width, args.height)
+    try:
+        if args.host:
+            print(f"waiting for an opponent on port {args.host}...")
+            app.start_versus(args.host)
+        elif args.join:
+            address, port = args.join.rsplit(":", 1)
+            app.start_versus(int(port), address)
+    except VersusError as error:
+        app.destroy()
+        parser.exit(1, f"versus: {error}\n")
     app.mainloop()
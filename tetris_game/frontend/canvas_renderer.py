@@ -0,0 +1,158 @@
+from engine import COLORS, LANDED_COLOR, Piece
+
+EMPTY = "#FAEDCB"
+
+
+class CanvasRenderer:
+    """
+    Draws an `Engine` on a tk.Canvas with persistent items: one rectangle per
+    board cell, per active-piece cell and per ghost cell. Every update only
+    calls coords/itemconfig on the items that actually changed, so a frame
+    costs as much as the cells that changed, not the cells on screen.
+    Plugs into `World` as its view.
+    """
+
+    def __init__(self, canvas, size=30, origin=(0, 0)):
+        self.canvas = canvas
+        self.size = size
+        self.x0, self.y0 = origin      # canvas position of the board's top-left corner
+        self.engine = None
+        self.board_items = []
+        self.fills = []                # fill currently shown by each board item
+        self.colors = []               # fill each board cell should show
+        self.piece_items = []
+        self.ghost_items = []
+        self.shown = {}                # item -> coords it currently has
+        self.text = None
+
+    def attach(self, engine):
+        """Creates every canvas item the board and the active piece will ever need"""
+        self.engine = engine
+        width, height = engine.board.width, engine.board.height
+        rect = self.canvas.create_rectangle
+        self.board_items = [[rect(*self.cell_coords(col, row), fill=EMPTY) for col in range(width)]
+                            for row in range(height)]
+        self.fills = [[EMPTY] * width for _ in range(height)]
+        self.colors = [[EMPTY] * width for _ in range(height)]
+        self.ghost_items = [rect(0, 0, 0, 0, outline="gray", width=2, state="hidden") for _ in range(4)]
+        self.piece_items = [rect(0, 0, 0, 0, state="hidden") for _ in range(4)]
+        self.shown = {}
+        self.text = self.canvas.create_text(self.x0 + width * self.size / 2, self.y0 + height * self.size / 2,
+                                            text="GAME OVER!", fill="white",
+                                            font=("Arial", 40, "bold"), state="hidden")
+
+    def cell_coords(self, col, row):
+        """Canvas rectangle of a grid cell, row 0 being the bottom row"""
+        s = self.size
+        x = self.x0 + col * s
+        y = self.y0 + (self.engine.board.height - 1 - row) * s
+        return x, y, x + s, y + s
+
+    def reset(self):
+        """Shows the engine's board, empty unless a snapshot was restored into it"""
+        width = self.engine.board.width
+        self.colors = [[LANDED_COLOR if mask >> col & 1 else EMPTY for col in range(width)] if mask
+                       else [EMPTY] * width for mask in self.engine.board.rows]
+        self.refresh_rows(range(len(self.colors)))
+        self.canvas.itemconfig(self.text, state="hidden")
+        self.spawn()
+
+    def refresh_rows(self, rows):
+        """Re-fills the board items of `rows` whose color changed"""
+        for row in rows:
+            shown, wanted, items = self.fills[row], self.colors[row], self.board_items[row]
+            for col, color in enumerate(wanted):
+                if shown[col] != color:
+                    self.canvas.itemconfig(items[col], fill=color)
+                    shown[col] = color
+
+    def spawn(self):
+        color = COLORS[self.engine.piece.kind]
+        for item in self.piece_items:
+            self.canvas.itemconfig(item, fill=color)
+        self.show_piece()
+
+    def show_piece(self):
+        self.move_items(self.piece_items, self.engine.piece.cells())
+        self.move_items(self.ghost_items, self.engine.ghost_cells())
+
+    def move_items(self, items, cells):
+        height = self.engine.board.height
+        for item, (col, row) in zip(items, cells):
+            coords = self.cell_coords(col, row) if row < height else None
+            if self.shown.get(item) == coords:
+                continue
+            if coords is None:
+                self.canvas.itemconfig(item, state="hidden")
+            else:
+                if self.shown.get(item) is None:
+                    self.canvas.itemconfig(item, state="normal")
+                self.canvas.coords(item, *coords)
+            self.shown[item] = coords
+
+    def landed(self, piece):
+        """Copies a locked piece into the board colors and replays the engine's line clear"""
+        height, width = self.engine.board.height, self.engine.board.width
+        colors, color = self.colors, COLORS[piece.kind]
+        dirty = set()
+        for col, row in piece.cells():
+            if row < height:
+                colors[row][col] = color
+                dirty.add(row)
+        for row in self.engine.cleared:
+            colors[row] = [EMPTY] * width
+            dirty.add(row)
+        for src, dst in self.engine.moved:
+            colors[dst], colors[src] = colors[src], [EMPTY] * width
+            dirty.update((src, dst))
+        raised = self.engine.raised
+        if raised:          # versus garbage pushed in under the stack
+            garbage = [[LANDED_COLOR if mask >> col & 1 else EMPTY for col in range(width)]
+                       for mask in self.engine.board.rows[:raised]]
+            colors[:] = garbage + colors[:height - raised]
+            dirty = range(height)
+        self.refresh_rows(dirty)
+
+    def game_over(self):
+        self.canvas.itemconfig(self.text, state="normal")
+        self.canvas.tag_raise(self.text)
+
+
+class MirrorRenderer:
+    """Draws a versus opponent (`versus.Opponent`) from its row masks, e.g. small on a side panel.
+    Like `CanvasRenderer` it keeps one item per cell and only refills the rows that changed."""
+
+    def __init__(self, canvas, width, height, size=10, origin=(0, 0)):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.size = size
+        self.x0, self.y0 = origin
+        rect = canvas.create_rectangle
+        self.items = [[rect(*self.cell_coords(col, row), fill=EMPTY, outline="") for col in range(width)]
+                      for row in range(height)]
+        self.masks = [0] * height
+        self.piece_items = [rect(0, 0, 0, 0, state="hidden", outline="") for _ in range(4)]
+
+    def cell_coords(self, col, row):
+        s = self.size
+        x = self.x0 + col * s
+        y = self.y0 + (self.height - 1 - row) * s
+        return x, y, x + s, y + s
+
+    def update(self, opponent, rows):
+        for row in rows:
+            mask, old = opponent.rows[row], self.masks[row]
+            for col in range(self.width):
+                if (mask ^ old) >> col & 1:
+                    self.canvas.itemconfig(self.items[row][col], fill=LANDED_COLOR if mask >> col & 1 else EMPTY)
+            self.masks[row] = mask
+        if opponent.piece:
+            kind, rotation, col, row = opponent.piece
+            cells = Piece(kind, col, row, rotation).cells()
+            for item, (c, r) in zip(self.piece_items, cells):
+                if r < self.height:
+                    self.canvas.coords(item, *self.cell_coords(c, r))
+                    self.canvas.itemconfig(item, fill=COLORS[kind], state="normal")
+                else:
+                    self.canvas.itemconfig(item, state="hidden")
@@ -0,0 +1,46 @@
+"""Random but seeded input streams for driving engines in tests, and stand-ins for
+the clock and Tk timers."""
+import random
+
+ACTIONS = ("left", "right", "rotate", "down", "hard_drop", "step")
+
+
+def random_actions(seed, count):
+    rng = random.Random(seed)
+    # mostly moves, with enough drops and ticks for pieces to land
+    return rng.choices(ACTIONS, weights=(3, 3, 3, 2, 1, 2), k=count)
+
+
+class FakeClock:
+    """A `clock=` that only moves when told to, in seconds like time.monotonic"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+class FakeWidget:
+    """A Tk widget's after/after_cancel; the callbacks run when `fire()` is called"""
+
+    def __init__(self):
+        self.pending = {}
+        self.last_id = 0
+
+    def after(self, ms, callback):
+        self.last_id += 1
+        self.pending[self.last_id] = callback
+        return self.last_id
+
+    def after_cancel(self, id):
+        del self.pending[id]
+
+    def fire(self):
+        callbacks = list(self.pending.values())
+        self.pending.clear()
+        for callback in callbacks:
+            callback()
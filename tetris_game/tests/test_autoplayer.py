@@ -0,0 +1,38 @@
+import pytest
+
+from engine import Engine
+from autoplayer import AutoPlayer, TranspositionTable, board_array, board_hashes
+
+from helpers import random_actions
+
+
+@pytest.mark.parametrize("width, height", [(10, 20), (100, 200), (7, 12)])
+def test_board_hashes_match_board_hash(width, height):
+    engine = Engine(width, height, seed=2)
+    for action in random_actions(2, 2000):
+        if engine.over:
+            break
+        getattr(engine, action)()
+    board = board_array(engine.board)
+    top = max(engine.board.heights) + 1         # the search leaves the empty rows out
+    for rows in (board, board[:top]):
+        assert int(board_hashes(rows[None], engine.board.keys)[0]) == engine.board.hash
+
+
+def test_table_is_bounded_and_counts():
+    table = TranspositionTable(capacity=2)
+    table.put("a", 1)
+    table.put("b", 2)
+    assert table.get("a") == 1          # "b" is now the least recently used
+    table.put("c", 3)
+    assert table.get("b") is None
+    assert table.stats() == {"hits": 1, "misses": 1, "size": 2, "hit_rate": 0.5}
+
+
+def test_cached_scores_play_the_same_game():
+    table = TranspositionTable()
+    first = AutoPlayer(lookahead=True, table=table).play(Engine(seed=4), 40)
+    misses = table.misses
+    again = AutoPlayer(lookahead=True, table=table).play(Engine(seed=4), 40)
+    assert table.misses == misses and table.hits == misses      # every board came from the table
+    assert again.board.rows == first.board.rows and again.score == first.score
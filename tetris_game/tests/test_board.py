@@ -0,0 +1,54 @@
+from engine import Board, Engine
+
+from helpers import random_actions
+
+
+def check_invariants(board: Board):
+    h = board.hash
+    board.rehash()
+    assert board.hash == h
+    heights = board.heights
+    board.update_heights()
+    assert board.heights == heights
+    assert all(0 <= mask <= board.full_row for mask in board.rows)
+    assert board.full_row not in board.rows
+
+
+def test_hash_and_heights_follow_random_games():
+    for seed in range(40):
+        engine = Engine(seed=seed)
+        for action in random_actions(seed, 400):
+            getattr(engine, action)()
+            check_invariants(engine.board)
+            if engine.over:
+                engine.reset(seed + 1000)
+
+
+def test_invariants_on_a_wide_board():
+    engine = Engine(70, 30, seed=7)
+    for action in random_actions(7, 2000):
+        getattr(engine, action)()
+        check_invariants(engine.board)
+        if engine.over:
+            break
+
+
+def test_clear_lines_drops_rows_above():
+    board = Board(4, 6)
+    board.place_piece("I", 0, 0, -2)        # fills row 0
+    board.place_piece("O", 0, 0, 1)         # rows 1-2, columns 0-1
+    cleared, moved = board.clear_lines()
+    assert cleared == [0]
+    assert moved == [(1, 0), (2, 1)]
+    assert board.rows[:3] == [0b11, 0b11, 0]
+    assert board.heights == [2, 2, 0, 0]
+    check_invariants(board)
+
+
+def test_equal_boards_hash_equal():
+    a, b = Board(), Board()
+    a.place_piece("O", 0, 0, 0)
+    a.place_piece("O", 0, 4, 0)
+    b.place_piece("O", 0, 4, 0)
+    b.place_piece("O", 0, 0, 0)
+    assert a.rows == b.rows and a.hash == b.hash
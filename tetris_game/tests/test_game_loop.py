@@ -0,0 +1,55 @@
+from game_loop import GameLoop
+
+from helpers import FakeClock, FakeWidget
+
+
+def loop(period_ms=100, max_catch_up=5):
+    clock, widget, steps, frames = FakeClock(), FakeWidget(), [], []
+    game = GameLoop(widget, lambda: steps.append(clock.now), period_ms=period_ms,
+                    max_catch_up=max_catch_up, on_frame=lambda: frames.append(len(steps)), clock=clock)
+    return game, clock, widget, steps, frames
+
+
+def test_runs_one_step_per_elapsed_period():
+    game, clock, widget, steps, frames = loop()
+    game.start()
+    for _ in range(10):
+        clock.advance(30)
+        widget.fire()
+    assert len(steps) == 3          # 300 ms
+    assert frames == [0, 0, 0, 1, 1, 1, 2, 2, 2, 3]
+
+
+def test_a_late_frame_catches_up():
+    game, clock, widget, steps, _ = loop()
+    game.start()
+    clock.advance(250)
+    widget.fire()
+    assert len(steps) == 2
+    clock.advance(60)               # with the 50 ms left over, a period has passed
+    widget.fire()
+    assert len(steps) == 3
+
+
+def test_a_long_stall_is_capped_and_dropped():
+    game, clock, widget, steps, _ = loop(max_catch_up=5)
+    game.start()
+    clock.advance(2000)
+    widget.fire()
+    assert len(steps) == 5
+    assert game.lag < game.period_ms
+    clock.advance(16)
+    widget.fire()
+    assert len(steps) == 5
+
+
+def test_start_and_stop_never_stack_timers():
+    game, clock, widget, steps, _ = loop()
+    game.start()
+    game.start()
+    assert len(widget.pending) == 1
+    game.stop()
+    assert widget.pending == {}
+    clock.advance(1000)
+    widget.fire()
+    assert steps == []
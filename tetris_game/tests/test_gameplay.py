@@ -0,0 +1,71 @@
+from engine import Engine
+from gameplay import World
+
+from helpers import FakeWidget
+
+
+class FakeScreen:
+    def __init__(self):
+        self.canvas = FakeWidget()
+
+    def getcanvas(self):
+        return self.canvas
+
+    def update(self):
+        pass
+
+
+class CountingView:
+    """A view that only counts the calls into it"""
+
+    def __init__(self):
+        self.calls = []
+
+    def attach(self, engine):
+        self.engine = engine
+
+    def reset(self):
+        self.calls.append("reset")
+
+    def spawn(self):
+        self.calls.append("spawn")
+
+    def show_piece(self):
+        self.calls.append("show_piece")
+
+    def landed(self, piece):
+        self.calls.append("landed")
+
+    def game_over(self):
+        self.calls.append("game_over")
+
+
+def world():
+    view = CountingView()
+    game = World(screen=FakeScreen(), view=view, seed=3)
+    view.calls.clear()
+    return game, view
+
+
+def test_a_burst_of_inputs_is_drawn_once():
+    game, view = world()
+    actions = ("left", "down", "left", "rotate", "down")     # a key twice in a row would coalesce
+    reference = Engine(seed=3)
+    for action in actions:
+        getattr(reference, action)()
+        game.inputs.press(action)
+        game.inputs.release(action)
+    game.handle_inputs()
+    assert repr(game.engine.piece) == repr(reference.piece)
+    assert view.calls == ["show_piece"]
+    assert len(game.recorder.replay.inputs) == 5
+
+
+def test_a_lock_in_the_burst_shows_the_next_piece():
+    game, view = world()
+    game.run(["left", "hard_drop", "right", "right"])
+    assert game.engine.pieces == 1
+    assert view.calls == ["landed", "spawn", "show_piece"]
+    view.calls.clear()
+    game.run(["left", "hard_drop"])
+    assert view.calls == ["landed", "spawn"]
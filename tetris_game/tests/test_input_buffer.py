@@ -0,0 +1,66 @@
+from input_buffer import InputBuffer
+
+from helpers import FakeClock
+
+
+def buffer():
+    clock = FakeClock()
+    return InputBuffer(das_ms=170, arr_ms=50, max_repeat=10, clock=clock), clock
+
+
+def test_a_tap_gives_one_action():
+    inputs, clock = buffer()
+    inputs.press("rotate")
+    inputs.release("rotate")
+    assert inputs.drain() == ["rotate"]
+    clock.advance(1000)
+    assert inputs.drain() == []
+
+
+def test_a_held_key_repeats_after_das_then_every_arr():
+    inputs, clock = buffer()
+    inputs.press("left")
+    assert inputs.drain() == ["left"]
+    clock.advance(169)
+    assert inputs.drain() == []
+    clock.advance(1)
+    assert inputs.drain() == ["left"]
+    clock.advance(49)
+    assert inputs.drain() == []
+    clock.advance(1)
+    assert inputs.drain() == ["left"]
+    inputs.release("left")
+    clock.advance(500)
+    assert inputs.drain() == []
+
+
+def test_repeats_per_frame_are_capped():
+    inputs, clock = buffer()
+    inputs.press("down")
+    inputs.drain()
+    clock.advance(2000)         # a long stall
+    assert inputs.drain() == ["down"] * 10
+
+
+def test_os_key_repeat_coalesces_into_the_hold():
+    inputs, clock = buffer()
+    inputs.press("right")
+    assert inputs.drain() == ["right"]
+    clock.advance(30)
+    inputs.press("right")           # repeat press of a key already down
+    inputs.release("right")         # X11 release/press pair
+    inputs.press("right")
+    assert inputs.drain() == []
+    clock.advance(140)              # still held since the first press: DAS is due
+    assert inputs.drain() == ["right"]
+
+
+def test_the_direction_pressed_last_wins():
+    inputs, clock = buffer()
+    inputs.press("left")
+    inputs.drain()
+    clock.advance(100)
+    inputs.press("right")
+    assert inputs.drain() == ["right"]
+    clock.advance(170)
+    assert inputs.drain() == ["right"]
@@ -0,0 +1,62 @@
+import pytest
+
+from engine import Engine
+from replay import Recorder, Replay, ReplayError
+from snapshot import restore, snapshot
+
+from helpers import random_actions
+
+
+def record_game(seed, count=600):
+    engine = Engine(seed=seed)
+    recorder = Recorder(engine)
+    for action in random_actions(seed, count):
+        if engine.over:
+            break
+        if action == "step":
+            engine.step()
+        else:
+            recorder.record(action)
+            getattr(engine, action)()
+    return engine, recorder.finish()
+
+
+def test_round_trip_keeps_every_input():
+    _, replay = record_game(3)
+    copy = Replay.from_bytes(replay.to_bytes())
+    assert (copy.seed, copy.width, copy.height, copy.bag, copy.end_tick) == \
+        (replay.seed, replay.width, replay.height, replay.bag, replay.end_tick)
+    assert copy.inputs == replay.inputs
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_playback_reproduces_the_game(seed):
+    engine, replay = record_game(seed)
+    played = Replay.from_bytes(replay.to_bytes()).play()
+    assert played.board.rows == engine.board.rows
+    assert (played.score, played.lines, played.pieces, played.ticks, played.over) == \
+        (engine.score, engine.lines, engine.pieces, engine.ticks, engine.over)
+
+
+def test_a_restored_game_is_not_replayed_from_its_seed():
+    engine, _ = record_game(4, 200)
+    copy = restore(snapshot(engine), Engine(seed=4))
+    recorder = Recorder(copy)
+    recorder.reset(restored=True)
+    with pytest.raises(ReplayError):
+        recorder.finish()
+    recorder.reset()
+    assert recorder.finish().seed == copy.seed
+
+
+def test_rejects_foreign_and_truncated_data():
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(b"TRP")
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(b"XXXX" + bytes(20))
+    _, replay = record_game(1)
+    data = replay.to_bytes()
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data + b"\x80")       # an input cut off mid-varint
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data + b"\x07")       # action codes stop at 4
@@ -0,0 +1,56 @@
+import pytest
+
+from engine import Engine
+from snapshot import HEADER, SnapshotError, restore, snapshot
+
+from helpers import random_actions
+
+
+def state(engine):
+    piece = engine.piece
+    return (engine.board.rows, engine.board.heights, engine.board.hash,
+            (piece.kind, piece.rotation, piece.col, piece.row),
+            engine.score, engine.lines, engine.pieces, engine.ticks, engine.over,
+            engine.shapes.state, engine.shapes.pending)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_restore_equals_original_and_continues_the_same(seed):
+    engine = Engine(seed=seed)
+    actions = random_actions(seed, 800)
+    for action in actions[:400]:
+        getattr(engine, action)()
+    copy = restore(snapshot(engine))
+    assert state(copy) == state(engine)
+    for action in actions[400:]:
+        getattr(engine, action)()
+        getattr(copy, action)()
+    assert state(copy) == state(engine)
+
+
+def test_restores_into_an_existing_engine():
+    engine = Engine(seed=5)
+    for action in random_actions(5, 300):
+        getattr(engine, action)()
+    target = Engine(seed=99)
+    assert restore(snapshot(engine), target) is target
+    assert state(target) == state(engine)
+
+
+def test_rejects_bad_data():
+    data = snapshot(Engine(seed=1))
+    with pytest.raises(SnapshotError):
+        restore(data[:10])
+    with pytest.raises(SnapshotError):
+        restore(data[:-1])
+    with pytest.raises(SnapshotError):
+        restore(b"XXXX" + data[4:])
+
+    engine = Engine(seed=1)
+    engine.hard_drop()          # leaves kinds in the bag
+    good = snapshot(engine)
+    for offset, value in ((10, 9), (11, 4), (HEADER.size, 7)):      # piece kind, rotation, bag entry
+        bad = bytearray(good)
+        bad[offset] = value
+        with pytest.raises(SnapshotError):
+            restore(bytes(bad))
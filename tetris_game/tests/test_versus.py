@@ -0,0 +1,90 @@
+import socket
+import struct
+
+import pytest
+
+from engine import Engine
+from versus import GARBAGE, GARBAGE_SENT, HEAD, HELLO, LENGTH, MAGIC, ROW, VersusError, VersusLink
+
+
+def linked(size_a=(10, 20), size_b=(10, 20)):
+    a, b = socket.socketpair()
+    return VersusLink(Engine(*size_a, seed=1), a), VersusLink(Engine(*size_b, seed=2), b)
+
+
+def sync(*links, rounds=3):
+    for _ in range(rounds):
+        for link in links:
+            link.sync()
+
+
+def test_mirrors_the_opponent():
+    a, b = linked()
+    for _ in range(5):
+        a.engine.hard_drop()
+        sync(a, b)
+    assert a.ready and b.ready
+    assert b.opponent.rows == a.engine.board.rows
+    assert b.opponent.score == a.engine.score
+
+
+def test_restart_resends_the_whole_board():
+    a, b = linked()
+    for _ in range(6):
+        a.engine.hard_drop()
+        sync(a, b)
+    b.opponent.over = True          # as if a's last game had ended
+    a.engine.reset()
+    a.reset()
+    sync(a, b)
+    assert b.opponent.rows == a.engine.board.rows == [0] * 20
+    assert not b.opponent.over
+    assert b.opponent.score == 0
+
+
+def test_refuses_a_different_board_size():
+    a, b = linked((10, 20), (10, 30))
+    sync(a, b)
+    assert a.closed and b.closed
+    assert "10x30" in a.error and "10x20" in b.error
+
+
+def test_wait_ready_raises_on_mismatch():
+    a, b = linked((10, 20), (12, 20))
+    with pytest.raises(VersusError):
+        a.wait_ready(timeout=1)
+
+
+def raw_peer(link_size=(10, 20)):
+    """A link and the bare socket of its peer, past the hello"""
+    a, b = socket.socketpair()
+    link = VersusLink(Engine(*link_size, seed=1), a)
+    b.sendall(LENGTH.pack(HELLO.size) + HELLO.pack(MAGIC, *link_size))
+    link.sync()
+    assert link.ready
+    return link, b
+
+
+def send(sock, message):
+    sock.sendall(LENGTH.pack(len(message)) + message)
+
+
+def test_row_off_the_board_closes_the_link():
+    link, peer = raw_peer()
+    send(peer, HEAD.pack(0, 1, 1) + ROW.pack(25) + (1).to_bytes(2, "little"))
+    link.sync()
+    assert link.closed and "row 25" in link.error
+
+
+def test_hole_off_the_board_closes_the_link():
+    link, peer = raw_peer()
+    send(peer, HEAD.pack(GARBAGE_SENT, 1, 0) + GARBAGE.pack(2, 10))
+    link.sync()
+    assert link.closed and link.engine.incoming == []
+
+
+def test_truncated_message_closes_the_link():
+    link, peer = raw_peer()
+    send(peer, struct.pack("<B", 1))
+    link.sync()
+    assert link.closed and link.error